@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+
+PARTS_PER_DAY = 500
+RELEASE_EVENTS_PER_DAY = 1_000
+
+
+def feature_names(n_features):
+    return [f"feature_{i:03d}" for i in range(n_features)]
+
+
+def _dates(n_rows, rows_per_day, start="2020-01-01"):
+    n_days = max(-(-n_rows // rows_per_day), 2)
+    day_index = np.arange(n_rows) * n_days // n_rows
+    return pd.Timestamp(start) + pd.to_timedelta(day_index, unit="D")
+
+
+def generate_parts_warehouse(n_rows, n_features, seed=42):
+    """
+    Parts-warehouse style raw events: one row per part per day, supplier
+    and location keys, and n_features positive KPIs with a shift over
+    the last 5% of the history.
+    """
+    rng = np.random.default_rng(seed)
+    names = feature_names(n_features)
+
+    base = rng.uniform(10, 1_000, n_features).astype(np.float32)
+    values = base * (1 + 0.1 * rng.standard_normal((n_rows, n_features), dtype=np.float32))
+    values[int(n_rows * 0.95):, : max(n_features // 5, 1)] *= 1.5
+
+    df = pd.DataFrame(values, columns=names)
+    df.insert(0, "business_date", _dates(n_rows, PARTS_PER_DAY))
+    df.insert(1, "supplier_id", pd.Categorical.from_codes(
+        rng.integers(0, 20, n_rows), [f"S{i:02d}" for i in range(20)]
+    ))
+    df.insert(2, "inventory_location", pd.Categorical.from_codes(
+        rng.integers(0, 10, n_rows), [f"LOC{i:02d}" for i in range(10)]
+    ))
+    return df
+
+
+def generate_product_release(n_rows, n_features, seed=42):
+    """
+    Product-release style raw events: product KPIs with a release window
+    over the last 1% of the history that raises half of them.
+    """
+    rng = np.random.default_rng(seed)
+    names = feature_names(n_features)
+
+    base = rng.uniform(0.01, 200, n_features).astype(np.float32)
+    values = base * (1 + 0.05 * rng.standard_normal((n_rows, n_features), dtype=np.float32))
+
+    release = np.zeros(n_rows, dtype=np.int8)
+    release[int(n_rows * 0.99):] = 1
+    values[release == 1, : max(n_features // 2, 1)] *= 1.4
+
+    df = pd.DataFrame(values, columns=names)
+    df.insert(0, "business_date", _dates(n_rows, RELEASE_EVENTS_PER_DAY))
+    df["release_flag"] = release
+    return df
+
+
+DATASETS = {
+    "parts_warehouse": generate_parts_warehouse,
+    "product_release": generate_product_release,
+}
+
+
+def benchmark_config(n_features):
+    """
+    Use-case config for synthetic data: alternating sum/mean aggregation,
+    bounds on a few features, and hypotheses over the first features.
+    """
+    names = feature_names(n_features)
+
+    return {
+        "state_builder": {
+            "date_column": "business_date",
+            "time_unit": "day",
+            "aggregations": {
+                name: ("sum" if i % 2 else "mean") for i, name in enumerate(names)
+            },
+        },
+        "stage1": {
+            "features": names,
+            "window_days": 14,
+            "alpha": 0.01,
+            "feature_bounds": {
+                name: {"expected_max": 1e12, "caution_max": 2e12, "critical_max": 4e12}
+                for name in names[:5]
+            },
+            "risk_weights": {"t2": 0.35, "persistence": 0.25, "risk_zone": 0.25},
+        },
+        "stage3": {
+            "hypotheses": {
+                f"H{i}": {
+                    "prior": 1 / 4,
+                    "expectations": {names[(2 * i) % n_features]: "up", names[(2 * i + 1) % n_features]: "down"},
+                }
+                for i in range(4)
+            }
+        },
+    }
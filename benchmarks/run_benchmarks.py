@@ -0,0 +1,212 @@
+"""
+CADEN benchmark suite.
+
+Times the hot paths (state building, Stages 1, 2, 3 and 5) on synthetic
+parts-warehouse and product-release data at increasing scale, writes a
+machine-readable results file and compares it against a stored baseline.
+
+    python -m benchmarks.run_benchmarks --scales 10k,1M --features 10,50
+    python -m benchmarks.run_benchmarks --save-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datasets import DATASETS, benchmark_config
+from core.stage1 import run_stage1_v2
+from core.stage2 import run_stage2_v2
+from core.stage3 import run_stage3_v2
+from core.stage5 import compute_decision_metrics
+from core.state_builder import build_system_state
+
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_RESULTS = BENCH_DIR / "results.json"
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+
+SCALES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+FEATURES = [10, 50, 500]
+
+# Skip (rows x features) cells larger than this unless overridden
+DEFAULT_MAX_CELLS = 500_000_000
+
+
+def _measure(fn, repeat):
+    """Best wall time over `repeat` runs, then one traced run for peak memory."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = fn()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return result, best, peak / 1024 ** 2
+
+
+def bench_case(dataset, n_rows, n_features, repeat):
+    cfg = benchmark_config(n_features)
+    state_cfg, stage1_cfg = cfg["state_builder"], cfg["stage1"]
+
+    df_raw = DATASETS[dataset](n_rows, n_features)
+
+    records = []
+
+    state_df, seconds, peak = _measure(
+        lambda: build_system_state(
+            df_raw, state_cfg["date_column"], state_cfg["time_unit"], state_cfg["aggregations"]
+        ),
+        repeat
+    )
+    records.append(("build_system_state", n_rows, seconds, peak))
+
+    def stage1():
+        return run_stage1_v2(
+            state_df.copy(), "time", stage1_cfg["features"], stage1_cfg["feature_bounds"],
+            stage1_cfg["window_days"], stage1_cfg["alpha"], stage1_cfg["risk_weights"]
+        )
+
+    stage1_out, seconds, peak = _measure(stage1, repeat)
+    records.append(("run_stage1_v2", len(state_df), seconds, peak))
+
+    stage2_out, seconds, peak = _measure(
+        lambda: run_stage2_v2(state_df, stage1_out, stage1_cfg["features"], stage1_cfg["window_days"]),
+        repeat
+    )
+    records.append(("run_stage2_v2", len(state_df), seconds, peak))
+
+    stage3_out, seconds, peak = _measure(
+        lambda: run_stage3_v2(stage2_out, stage1_out, cfg["stage3"]["hypotheses"]),
+        repeat
+    )
+    records.append(("run_stage3_v2", 1, seconds, peak))
+
+    _, seconds, peak = _measure(lambda: compute_decision_metrics(stage3_out), repeat)
+    records.append(("stage5", 1, seconds, peak))
+
+    return [
+        {
+            "dataset": dataset,
+            "rows": n_rows,
+            "features": n_features,
+            "stage": stage,
+            "seconds": seconds,
+            "throughput_rows_per_s": rows / seconds if seconds > 0 else None,
+            "peak_memory_mb": peak,
+        }
+        for stage, rows, seconds, peak in records
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """Results slower than baseline * (1 + tolerance), matched by case and stage."""
+    def key(r):
+        return (r["dataset"], r["rows"], r["features"], r["stage"])
+
+    reference = {key(r): r for r in baseline["results"]}
+    regressions = []
+
+    for r in results:
+        base = reference.get(key(r))
+        if base is None:
+            continue
+        ratio = r["seconds"] / base["seconds"] if base["seconds"] > 0 else 1.0
+        if ratio > 1 + tolerance:
+            regressions.append({**r, "baseline_seconds": base["seconds"], "slowdown": ratio})
+
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CADEN benchmark suite")
+    parser.add_argument("--datasets", default=",".join(DATASETS))
+    parser.add_argument("--scales", default="10k,1M,10M", help=f"Comma list of {list(SCALES)} or row counts")
+    parser.add_argument("--features", default=",".join(map(str, FEATURES)))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-cells", type=float, default=DEFAULT_MAX_CELLS,
+                        help="Skip cases with rows x features above this")
+    parser.add_argument("--output", default=str(DEFAULT_RESULTS))
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed slowdown vs baseline before flagging a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    scales = [SCALES[s] if s in SCALES else int(float(s)) for s in args.scales.split(",")]
+    features = [int(f) for f in args.features.split(",")]
+
+    results = []
+    for dataset in args.datasets.split(","):
+        for n_rows in scales:
+            for n_features in features:
+                if n_rows * n_features > args.max_cells:
+                    print(f"skip {dataset} rows={n_rows:,} features={n_features} (exceeds --max-cells)")
+                    continue
+
+                print(f"{dataset} rows={n_rows:,} features={n_features}")
+                for record in bench_case(dataset, n_rows, n_features, args.repeat):
+                    results.append(record)
+                    print(
+                        f"  {record['stage']:<20} {record['seconds']:>10.4f}s"
+                        f"  peak {record['peak_memory_mb']:>9.1f} MB"
+                    )
+
+    report = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not Path(args.baseline).exists():
+        print("No baseline to compare against (run with --save-baseline).")
+        return 0
+
+    regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+    if not regressions:
+        print("No regressions against baseline.")
+        return 0
+
+    print(f"\n{len(regressions)} regression(s) against baseline:")
+    for r in regressions:
+        print(
+            f"  {r['dataset']} rows={r['rows']:,} features={r['features']} {r['stage']}: "
+            f"{r['seconds']:.4f}s vs {r['baseline_seconds']:.4f}s ({r['slowdown']:.2f}x)"
+        )
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
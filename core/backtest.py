@@ -0,0 +1,302 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from core.pipeline import Pipeline
+from core.service import json_default
+from core.stage1 import run_stage1_backfill
+from core.stage2 import run_stage2_v2
+from core.stage3 import run_stage3_batch
+from core.state_builder import _validate_inputs
+from core.time_buckets import bucket_times
+from core.window_index import WindowStatsIndex
+from utils.config import load_config
+
+
+# Window-end chunks handed to each worker process
+CHUNKS_PER_JOB = 4
+
+# Per-process replay context, set once by _init_worker
+_CONTEXT = {}
+
+
+# -----------------------------
+# Ground truth
+# -----------------------------
+def bucket_truth(df_raw, config, label_column, type_column=None):
+    """
+    Ground truth per state time bucket: the share of raw rows labelled
+    anomalous (label_column > 0) and, when type_column is given, the most
+    common anomaly type among them.
+    """
+    if label_column not in df_raw.columns:
+        raise ValueError(f"Label column '{label_column}' not found in dataframe")
+    if type_column is not None and type_column not in df_raw.columns:
+        raise ValueError(f"Type column '{type_column}' not found in dataframe")
+
+    if "state_builder" in config:
+        state_cfg = config["state_builder"]
+        _validate_inputs(df_raw.columns, state_cfg["date_column"], state_cfg["aggregations"], [])
+        dates = pd.to_datetime(df_raw[state_cfg["date_column"]], format=state_cfg.get("date_format"))
+        times = bucket_times(
+            dates, state_cfg["time_unit"], state_cfg.get("week_start", "monday"), state_cfg.get("timezone")
+        )
+    else:
+        if config["data"]["time_column"] not in df_raw.columns:
+            raise ValueError(f"Time column '{config['data']['time_column']}' not found in dataframe")
+        times = df_raw[config["data"]["time_column"]]
+        if pd.api.types.is_integer_dtype(times):
+            times = pd.to_datetime(times, unit="D")
+
+    labels = pd.DataFrame({"time": np.asarray(times), "label": df_raw[label_column].to_numpy() > 0})
+    truth = labels.groupby("time").agg(share=("label", "mean"))
+
+    if type_column is not None:
+        types = labels.assign(type=df_raw[type_column].to_numpy())[labels["label"]]
+        truth["type"] = types.groupby("time")["type"].agg(lambda t: t.mode().iloc[0])
+
+    return truth.sort_index()
+
+
+# -----------------------------
+# Replay
+# -----------------------------
+def _init_worker(state_df, config, compiled):
+    features = config["stage1"]["features"]
+    _CONTEXT.update(
+        state_df=state_df,
+        config=config,
+        compiled=compiled,
+        index=WindowStatsIndex(state_df, "time", features),
+    )
+
+
+def _replay_chunk(first_end, last_end):
+    """Stages 1–3 for every window ending in [first_end, last_end]."""
+    state_df, config = _CONTEXT["state_df"], _CONTEXT["config"]
+    stage1_cfg = config["stage1"]
+    features = stage1_cfg["features"]
+    window_days = stage1_cfg.get("window_days", 14)
+
+    # Rows the chunk's windows can reach; the backfill walks them once
+    times = state_df["time"]
+    span = state_df[(times >= first_end - timedelta(days=window_days)) & (times <= last_end)]
+
+    stage1_outs = [
+        out for out in run_stage1_backfill(
+            span, "time", features,
+            stage1_cfg.get("feature_bounds", {}),
+            window_days,
+            stage1_cfg.get("alpha", 0.01),
+            stage1_cfg.get("risk_weights")
+        )
+        if out["window_end"] >= first_end
+    ]
+
+    proceed = [out for out in stage1_outs if out["decision_gate"] == "proceed"]
+    stage2_outs = [
+        run_stage2_v2(state_df, out, features, window_days, _CONTEXT["index"])
+        for out in proceed
+    ]
+
+    top = {}
+    if stage2_outs:
+        compiled = _CONTEXT["compiled"]
+        posteriors = run_stage3_batch(stage2_outs, compiled)
+        for out, row in zip(proceed, posteriors):
+            top[out["window_end"]] = compiled.names[int(np.argmax(row))]
+
+    return [
+        {
+            "window_start": out["window_start"],
+            "window_end": out["window_end"],
+            "decision_gate": out["decision_gate"],
+            "anomaly_level": out["anomaly_level"],
+            "risk_score": out["risk_score"],
+            "top_hypothesis": top.get(out["window_end"]),
+        }
+        for out in stage1_outs
+    ]
+
+
+def replay(state_df, config, compiled, n_jobs=1):
+    """
+    Replay every historical window through Stages 1–3.
+
+    Window ends are split into chunks replayed by a process pool; each
+    worker receives state_df once and builds its own window index. Stage 1
+    uses the rolling backfill, Stages 2–3 run for proceed windows only
+    (as in the pipeline). Returns one record per window, in time order.
+    """
+    ends = np.unique(pd.to_datetime(state_df["time"]).to_numpy())
+    n_chunks = max(1, min(len(ends), n_jobs * CHUNKS_PER_JOB))
+    chunks = [
+        (pd.Timestamp(chunk[0]), pd.Timestamp(chunk[-1]))
+        for chunk in np.array_split(ends, n_chunks) if len(chunk)
+    ]
+
+    init = (state_df, config, compiled)
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker, initargs=init) as pool:
+            parts = list(pool.map(_replay_chunk, *zip(*chunks)))
+    else:
+        _init_worker(*init)
+        parts = [_replay_chunk(*chunk) for chunk in chunks]
+
+    return [record for part in parts for record in part]
+
+
+# -----------------------------
+# Scoring against ground truth
+# -----------------------------
+def evaluate(records, truth, min_share=0.5, hypothesis_map=None):
+    """
+    Precision / recall of decision_gate == proceed against windows that
+    contain a ground-truth anomalous bucket (share >= min_share), anomaly
+    levels on positive vs negative windows, detection delay per anomaly
+    event (a run of consecutive anomalous buckets) and top-hypothesis
+    accuracy on detected windows with a known anomaly type.
+    """
+    hypothesis_map = hypothesis_map or {}
+    windows = pd.DataFrame(records)
+
+    bucket_times_ = truth.index.to_numpy()
+    positive = (truth["share"] >= min_share).to_numpy()
+    positive_cum = np.concatenate([[0], np.cumsum(positive)])
+
+    lo = np.searchsorted(bucket_times_, windows["window_start"].to_numpy(dtype="datetime64[ns]"), side="left")
+    hi = np.searchsorted(bucket_times_, windows["window_end"].to_numpy(dtype="datetime64[ns]"), side="right")
+    actual = (positive_cum[hi] - positive_cum[lo]) > 0
+    predicted = (windows["decision_gate"] == "proceed").to_numpy()
+
+    tp = int(np.sum(actual & predicted))
+    fp = int(np.sum(~actual & predicted))
+    fn = int(np.sum(actual & ~predicted))
+
+    levels = {
+        level: {
+            "positive": int(np.sum(actual & (windows["anomaly_level"] == level).to_numpy())),
+            "negative": int(np.sum(~actual & (windows["anomaly_level"] == level).to_numpy())),
+        }
+        for level in ["none", "marginal", "moderate", "strong"]
+    }
+
+    # -----------------------------
+    # Detection delay per event
+    # -----------------------------
+    starts = np.flatnonzero(positive & ~np.concatenate([[False], positive[:-1]]))
+    stops = np.flatnonzero(positive & ~np.concatenate([positive[1:], [False]]))
+
+    ends = windows["window_end"].to_numpy(dtype="datetime64[ns]")
+    delays = []
+    for start, stop in zip(starts, stops):
+        event_start = bucket_times_[start]
+        # First proceed window that overlaps the event
+        hits = np.flatnonzero(
+            predicted & (ends >= event_start) &
+            (windows["window_start"].to_numpy(dtype="datetime64[ns]") <= bucket_times_[stop])
+        )
+        if len(hits):
+            delays.append((ends[hits[0]] - event_start) / np.timedelta64(1, "D"))
+
+    # -----------------------------
+    # Top-hypothesis accuracy
+    # -----------------------------
+    hypothesis_hits = hypothesis_total = 0
+    if "type" in truth:
+        positive_times = bucket_times_[positive]
+        positive_types = truth["type"].to_numpy()[positive]
+        for window_end, top in zip(ends[actual & predicted], windows["top_hypothesis"].to_numpy()[actual & predicted]):
+            latest = np.searchsorted(positive_times, window_end, side="right") - 1
+            if latest < 0 or not isinstance(positive_types[latest], str):
+                continue
+            expected = positive_types[latest]
+            hypothesis_total += 1
+            hypothesis_hits += int(top == hypothesis_map.get(expected, expected))
+
+    return {
+        "windows": len(windows),
+        "positive_windows": int(actual.sum()),
+        "predicted_windows": int(predicted.sum()),
+        "true_positives": tp,
+        "false_positives": fp,
+        "false_negatives": fn,
+        "precision": tp / (tp + fp) if tp + fp else None,
+        "recall": tp / (tp + fn) if tp + fn else None,
+        "anomaly_levels": levels,
+        "events": len(starts),
+        "events_detected": len(delays),
+        "detection_delay_days_mean": float(np.mean(delays)) if delays else None,
+        "detection_delay_days_max": float(np.max(delays)) if delays else None,
+        "hypothesis_accuracy": hypothesis_hits / hypothesis_total if hypothesis_total else None,
+    }
+
+
+def run_backtest(config, data_path, label_column, type_column=None, min_share=0.5,
+                 hypothesis_map=None, n_jobs=1):
+    """Build state and ground truth from data_path, replay it and score the replay."""
+    start = time.perf_counter()
+    df_raw = pd.read_csv(data_path)
+
+    truth = bucket_truth(df_raw, config, label_column, type_column)
+    pipeline = Pipeline({**config, "cache": {}, "stage4": {}})
+    state_df = pipeline.build_state(df_raw)
+    del df_raw
+
+    replay_start = time.perf_counter()
+    records = replay(state_df, config, pipeline.hypotheses, n_jobs)
+    replay_seconds = time.perf_counter() - replay_start
+
+    report = evaluate(records, truth, min_share, hypothesis_map)
+    report.update(
+        jobs=n_jobs,
+        replay_seconds=replay_seconds,
+        windows_per_second=len(records) / replay_seconds if replay_seconds > 0 else None,
+        wall_seconds=time.perf_counter() - start,
+    )
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Backtest CADEN against labelled data")
+    parser.add_argument("--config", default="config.yaml")
+    parser.add_argument("--data", default=None, help="Labelled raw CSV (default: config data.path)")
+    parser.add_argument("--label-column", required=True, help="e.g. is_anomaly or release_flag")
+    parser.add_argument("--type-column", default=None, help="e.g. anomaly_type")
+    parser.add_argument("--min-share", type=float, default=0.5,
+                        help="Share of anomalous rows that makes a time bucket anomalous")
+    parser.add_argument("--map", action="append", default=[], metavar="TYPE=HYPOTHESIS",
+                        help="Anomaly type to expected top hypothesis (repeatable)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--output", default=None, help="Write the report as JSON here")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    config = load_config(args.config)
+
+    report = run_backtest(
+        config,
+        args.data or config["data"]["path"],
+        args.label_column,
+        args.type_column,
+        args.min_share,
+        dict(item.split("=", 1) for item in args.map),
+        args.jobs
+    )
+
+    print(json.dumps(report, indent=2, default=json_default))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=json_default)
+
+
+if __name__ == "__main__":
+    main()
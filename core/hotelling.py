@@ -0,0 +1,170 @@
+import numpy as np
+
+
+def estimate_moments(X):
+    """
+    Window mean and sample covariance for a window or a stack of windows.
+
+    X: array of shape (..., n, p)
+    Returns (mu, Sigma) with shapes (..., p) and (..., p, p)
+    """
+    X = np.asarray(X, dtype=float)
+    n = X.shape[-2]
+
+    mu = X.mean(axis=-2)
+    centered = X - mu[..., None, :]
+    Sigma = np.swapaxes(centered, -1, -2) @ centered / (n - 1)
+
+    return mu, Sigma
+
+
+def _forward_substitution(L, B):
+    """
+    Solve L Z = B for a stack of lower-triangular L.
+
+    L: (..., p, p), B: (..., p, m)
+    Loops over the p columns only; every step is vectorized over the batch.
+    """
+    Z = np.empty(np.broadcast_shapes(L.shape[:-2], B.shape[:-2]) + B.shape[-2:])
+    p = L.shape[-1]
+
+    for i in range(p):
+        acc = B[..., i, :]
+        if i > 0:
+            acc = acc - np.einsum("...k,...km->...m", L[..., i, :i], Z[..., :i, :])
+        Z[..., i, :] = acc / L[..., i, i, None]
+
+    return Z
+
+
+def _t2_eigh(centered, Sigma, rcond):
+    """
+    Pseudo-inverse T² via eigendecomposition (near-singular fallback).
+
+    Works on the correlation scale so the cutoff does not depend on feature
+    units; directions with eigenvalues below rcond * max eigenvalue are dropped.
+    """
+    scale = np.sqrt(np.diagonal(Sigma, axis1=-2, axis2=-1))
+    corr = Sigma / (scale[..., :, None] * scale[..., None, :])
+
+    eigvals, eigvecs = np.linalg.eigh(corr)
+    keep = eigvals > rcond * eigvals.max(axis=-1, keepdims=True)
+    inv_vals = np.where(keep, 1.0 / np.where(keep, eigvals, 1.0), 0.0)
+
+    projected = (centered / scale[..., None, :]) @ eigvecs
+    return np.einsum("...np,...p->...n", projected ** 2, inv_vals)
+
+
+def t2_scores(X, mu, Sigma, ridge=1e-6, rcond=1e-10):
+    """
+    Hotelling T² for every row of X against (mu, Sigma).
+
+    Scores all rows in one batched operation using a Cholesky
+    factorization Sigma = L Lᵀ and a triangular solve L z = (x - mu), so
+    T² = ||z||². No explicit inverse is formed.
+
+    Falls back to an eigendecomposition pseudo-inverse when the
+    factorization fails or the covariance is near-singular, i.e. some
+    feature has less than rcond of its variance left unexplained by the
+    others (L_ii² / Sigma_ii < rcond, independent of feature units).
+
+    X: (..., n, p)   mu: (..., p)   Sigma: (..., p, p)
+    Leading dimensions are a batch of windows / entities.
+    Returns T² with shape (..., n)
+    """
+    X = np.asarray(X, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+    Sigma = np.asarray(Sigma, dtype=float)
+
+    p = Sigma.shape[-1]
+    Sigma = Sigma + ridge * np.eye(p)
+    centered = X - mu[..., None, :]
+
+    try:
+        L = np.linalg.cholesky(Sigma)
+    except np.linalg.LinAlgError:
+        return _t2_eigh(centered, Sigma, rcond)
+
+    unexplained = (
+        np.diagonal(L, axis1=-2, axis2=-1) ** 2 /
+        np.diagonal(Sigma, axis1=-2, axis2=-1)
+    )
+    ill_conditioned = unexplained.min(axis=-1) < rcond
+
+    # Triangular solve, L z = (x - mu)ᵀ (LAPACK for a single window)
+    rhs = np.swapaxes(centered, -1, -2)
+    if L.ndim == 2:
+        Z = np.linalg.solve(L, rhs)
+    else:
+        Z = _forward_substitution(L, rhs)
+
+    T2 = np.einsum("...pn,...pn->...n", Z, Z)
+
+    if np.any(ill_conditioned):
+        if L.ndim == 2:
+            return _t2_eigh(centered, Sigma, rcond)
+        T2[ill_conditioned] = _t2_eigh(
+            centered[ill_conditioned], Sigma[ill_conditioned], rcond
+        )
+
+    return T2
+
+
+def hotelling_t2(X, ridge=1e-6, rcond=1e-10):
+    """
+    Hotelling T² of every row of a window against that window's own
+    mean and covariance.
+
+    X: (n, p) for a single window or (b, n, p) for a stacked batch
+    Returns T² with shape (n,) or (b, n)
+    """
+    mu, Sigma = estimate_moments(X)
+    return t2_scores(X, mu, Sigma, ridge=ridge, rcond=rcond)
+
+
+class RollingMoments:
+    """
+    Running mean and covariance of a sliding window.
+
+    Rows enter and leave through rank-one (Welford) updates, so moving the
+    window by one row costs O(p²) instead of recomputing the covariance
+    from every row still inside it.
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.reset()
+
+    def reset(self):
+        self.n = 0
+        self.mean = np.zeros(self.p)
+        self.m2 = np.zeros((self.p, self.p))
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += np.outer(delta, x - self.mean)
+
+    def remove(self, x):
+        if self.n <= 1:
+            self.reset()
+            return
+
+        self.n -= 1
+        delta = x - self.mean
+        self.mean -= delta / self.n
+        self.m2 -= np.outer(delta, x - self.mean)
+
+    def refresh(self, X):
+        """Recompute exactly from the rows currently in the window."""
+        self.reset()
+        self.n = len(X)
+        if self.n:
+            self.mean = X.mean(axis=0)
+            centered = X - self.mean
+            self.m2 = centered.T @ centered
+
+    @property
+    def cov(self):
+        return self.m2 / (self.n - 1)
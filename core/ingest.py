@@ -0,0 +1,149 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from core.state_builder import _validate_inputs
+
+
+# Aggregations that only need numeric feature values
+NUMERIC_AGGREGATIONS = {"sum", "mean", "max", "min", "count"}
+
+# Rows sampled to tell integer from float columns before the real read
+DTYPE_SAMPLE_ROWS = 10_000
+
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+def _frame_mb(df):
+    return df.memory_usage(deep=True, index=False).sum() / 1024 ** 2
+
+
+def plan_dtypes(path, state_cfg, segment_keys=None, float_dtype="float32", overrides=None):
+    """
+    Columns and dtypes needed to build the state from a raw CSV.
+
+    Returns (columns, dtypes, int_columns, sample): only the date column,
+    segment keys and aggregated features are read; float features are read
+    directly as float_dtype, integer features are left to the parser and
+    downcast afterwards, segment keys become categoricals. overrides maps
+    column -> dtype and wins over the plan. sample is the default-dtype read
+    of the first DTYPE_SAMPLE_ROWS rows of every column, used to estimate
+    the footprint of an unplanned read.
+    """
+    date_column = state_cfg["date_column"]
+    aggregation_config = state_cfg["aggregations"]
+    segment_keys = list(segment_keys or [])
+
+    header = pd.read_csv(path, nrows=0).columns
+    _validate_inputs(header, date_column, aggregation_config, segment_keys)
+
+    columns = list(dict.fromkeys([date_column] + segment_keys + list(aggregation_config)))
+    sample = pd.read_csv(path, nrows=DTYPE_SAMPLE_ROWS)
+
+    dtypes = {key: "category" for key in segment_keys}
+    int_columns = []
+
+    for feature, agg in aggregation_config.items():
+        if feature in dtypes or agg not in NUMERIC_AGGREGATIONS:
+            continue
+        kind = sample[feature].dtype.kind
+        if kind in "iu":
+            int_columns.append(feature)
+        elif kind == "f":
+            dtypes[feature] = float_dtype
+
+    for column, dtype in (overrides or {}).items():
+        dtypes[column] = dtype
+        if column in int_columns:
+            int_columns.remove(column)
+
+    return columns, dtypes, int_columns, sample
+
+
+def _downcast(chunk, int_columns, float_dtype):
+    for column in int_columns:
+        if chunk[column].dtype.kind in "iu":
+            chunk[column] = pd.to_numeric(chunk[column], downcast="integer")
+        else:
+            # Missing values turned this chunk's integers into floats
+            chunk[column] = chunk[column].astype(float_dtype)
+    return chunk
+
+
+def _concat(chunks, int_columns, float_dtype):
+    if len(chunks) == 1:
+        return chunks[0]
+
+    categorical = {
+        column: union_categoricals([c[column] for c in chunks])
+        for column, dtype in chunks[0].dtypes.items()
+        if isinstance(dtype, pd.CategoricalDtype)
+    }
+    df = pd.concat(
+        [c.drop(columns=list(categorical)) for c in chunks], ignore_index=True
+    )
+    for column, values in categorical.items():
+        df[column] = values
+
+    # Chunks downcast to different int widths, or mixed int / float, widen on concat
+    for column in int_columns:
+        if df[column].dtype.kind == "f":
+            df[column] = df[column].astype(float_dtype)
+        else:
+            df[column] = pd.to_numeric(df[column], downcast="integer")
+
+    return df[chunks[0].columns]
+
+
+def read_raw(path, state_cfg, segment_keys=None, ingest_cfg=None):
+    """
+    Memory-lean raw read driven by the state_builder config.
+
+    Loads only the columns the state needs, applies the dtype plan from
+    plan_dtypes and parses the date column with the configured
+    date_format during the read. ingest_cfg (config data.ingest) may set
+    float_dtype ("float32" by default, "float64" keeps full precision),
+    downcast_ints, dtypes (per-column overrides) and chunksize.
+
+    Returns (df_raw, report) where report compares the footprint with a
+    default read of every column (estimated from the dtype sample).
+    """
+    ingest_cfg = ingest_cfg or {}
+    float_dtype = ingest_cfg.get("float_dtype", "float32")
+    date_column = state_cfg["date_column"]
+    date_format = state_cfg.get("date_format")
+
+    columns, dtypes, int_columns, sample = plan_dtypes(
+        path, state_cfg, segment_keys, float_dtype, ingest_cfg.get("dtypes")
+    )
+    if not ingest_cfg.get("downcast_ints", True):
+        int_columns = []
+
+    reader = pd.read_csv(
+        path,
+        usecols=columns,
+        dtype=dtypes,
+        parse_dates=[date_column],
+        date_format=date_format,
+        chunksize=ingest_cfg.get("chunksize", DEFAULT_CHUNKSIZE)
+    )
+    chunks = [_downcast(chunk, int_columns, float_dtype) for chunk in reader]
+
+    if chunks:
+        df = _concat(chunks, int_columns, float_dtype)[columns]
+    else:
+        df = pd.read_csv(path, usecols=columns, dtype=dtypes, nrows=0)[columns]
+
+    default_mb = _frame_mb(sample) / max(len(sample), 1) * len(df)
+    lean_mb = _frame_mb(df)
+
+    report = {
+        "rows": len(df),
+        "columns_read": len(columns),
+        "columns_total": sample.shape[1],
+        "memory_mb": round(float(lean_mb), 2),
+        "default_memory_mb": round(float(default_mb), 2),
+        "saved_mb": round(float(default_mb - lean_mb), 2),
+        "reduction": round(float(default_mb / lean_mb), 2) if lean_mb > 0 else None,
+        "dtypes": {column: str(dtype) for column, dtype in df.dtypes.items()},
+    }
+    return df, report
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class NarrativeCache:
+    """
+    Persistent cache of Stage 4 LLM narratives.
+
+    Keyed by a hash of (model, prompt, max_tokens), so re-running the same
+    window never spends API quota twice. Entries older than ttl_seconds
+    are treated as misses; beyond max_entries the least recently used
+    entries are evicted. Stored in a single SQLite file whose connection
+is shared between threads behind a lock.
+    """
+
+    def __init__(self, path=".caden_cache/narratives.sqlite", ttl_seconds=7 * 24 * 3600, max_entries=10_000):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS narratives ("
+            " key TEXT PRIMARY KEY,"
+            " text TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, prompt, max_tokens):
+        blob = json.dumps([model, prompt, max_tokens]).encode()
+        return hashlib.sha256(blob).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            now = time.time()
+            row = self._conn.execute(
+                "SELECT text, created FROM narratives WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM narratives WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE narratives SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, text):
+        with self._lock:
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO narratives (key, text, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, text, now, now)
+            )
+
+            excess = self._conn.execute("SELECT COUNT(*) FROM narratives").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM narratives WHERE key IN ("
+                    " SELECT key FROM narratives ORDER BY last_access LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += excess
+
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM narratives").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
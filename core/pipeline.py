@@ -0,0 +1,444 @@
+import cProfile
+import io
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from core.ingest import read_raw
+from core.raw_store import STORE_VERSION, open_store
+from core.narrative_cache import NarrativeCache
+from core.stage1 import run_stage1_segmented, run_stage1_v2
+from core.stage2 import run_stage2_v2
+from core.stage3 import compile_hypotheses, run_stage3_v2
+from core.stage4 import MAX_TOKENS, MODEL, run_stage4_llm
+from core.stage4_async import run_stage4_batch
+from core.stage5 import compute_decision_metrics
+from core.state_builder import build_system_state, build_system_state_chunked
+from core.state_cache import StateCache
+from core.window_index import WindowStatsIndex
+from utils.config import load_config
+
+
+PROFILE_TOP_N = 15
+
+
+def _max_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@dataclass
+class StageTiming:
+    wall_seconds: float
+    cpu_seconds: float
+    # Peak Python allocations during the stage (tracemalloc hook only)
+    peak_memory_mb: float | None = None
+    # Process RSS high-water mark once the stage finished
+    max_rss_mb: float | None = None
+
+
+@dataclass
+class PipelineResult:
+    state_df: pd.DataFrame
+    stage1: dict
+    stage2: dict | None = None
+    stage3: list | None = None
+    stage4: str | None = None
+    stage5: dict | None = None
+    segments: list | None = None
+    timings: dict = field(default_factory=dict)
+    profiles: dict = field(default_factory=dict)
+    # Prefix-sum statistics over state_df shared by Stages 1 and 2
+    # (stage1.window_index)
+    window_index: WindowStatsIndex | None = field(default=None, repr=False)
+
+    @property
+    def decision_gate(self):
+        return self.stage1.get("decision_gate")
+
+    def to_dict(self):
+        """Stage 1–5 outputs and stage timings (no state_df)."""
+        return {
+            "decision_gate": self.decision_gate,
+            "stage1": self.stage1,
+            "stage2": self.stage2,
+            "stage3": self.stage3,
+            "stage4": self.stage4,
+            "stage5": self.stage5,
+            "segments": self.segments,
+            "timings": {name: asdict(t) for name, t in self.timings.items()},
+        }
+
+    def timing_table(self):
+        """Per-stage timings as a DataFrame (one row per stage)."""
+        return pd.DataFrame(
+            [{"stage": name, **asdict(t)} for name, t in self.timings.items()]
+        )
+
+
+class Pipeline:
+    """
+    CADEN pipeline as a library: state building, Stage 1 gating and
+    Stages 2–5, with wall/CPU time and memory recorded per stage.
+
+    Optional hooks (from the `pipeline` config section or arguments):
+    - profile:      cProfile each stage; summaries land in result.profiles
+                    and .prof files in profile_dir when set
+    - trace_memory: tracemalloc peak per stage
+    """
+
+    def __init__(self, config, profile=None, trace_memory=None, profile_dir=None, narrative_client=None,
+                 narrative_async_client=None):
+        self.config = config
+        pipeline_cfg = config.get("pipeline", {})
+
+        self.profile = pipeline_cfg.get("profile", False) if profile is None else profile
+        self.trace_memory = pipeline_cfg.get("trace_memory", False) if trace_memory is None else trace_memory
+        self.profile_dir = profile_dir or pipeline_cfg.get("profile_dir")
+        self.narrative_client = narrative_client
+        self.narrative_async_client = narrative_async_client
+        self._raw = None
+        self.ingest_report = None
+
+        cache_cfg = config.get("cache", {}).get("state", {})
+        self.state_cache = (
+            StateCache(
+                cache_dir=cache_cfg.get("dir", ".caden_cache/state"),
+                max_bytes=int(cache_cfg.get("max_mb", 512) * 1024 ** 2),
+                hash_content=cache_cfg.get("hash_content", False)
+            )
+            if cache_cfg.get("enabled") else None
+        )
+
+        self.stage4_cfg = config.get("stage4", {})
+        narrative_cache_cfg = self.stage4_cfg.get("cache", {})
+        self.narrative_cache = (
+            NarrativeCache(
+                path=narrative_cache_cfg.get("path", ".caden_cache/narratives.sqlite"),
+                ttl_seconds=narrative_cache_cfg.get("ttl_hours", 168) * 3600,
+                max_entries=narrative_cache_cfg.get("max_entries", 10_000)
+            )
+            if narrative_cache_cfg.get("enabled") else None
+        )
+
+        # Compile once so missing expectation features are reported up front
+        self.hypotheses = compile_hypotheses(
+            config["stage3"]["hypotheses"], config["stage1"]["features"]
+        )
+
+    @classmethod
+    def from_config_file(cls, path="config.yaml", **kwargs):
+        return cls(load_config(path), **kwargs)
+
+    # -----------------------------
+    # Instrumentation
+    # -----------------------------
+    @contextmanager
+    def _stage(self, name, timings, profiles):
+        profiler = cProfile.Profile() if self.profile else None
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        wall, cpu = time.perf_counter(), time.process_time()
+        if profiler is not None:
+            profiler.enable()
+
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+            peak = None
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+
+            timings[name] = StageTiming(
+                wall_seconds=time.perf_counter() - wall,
+                cpu_seconds=time.process_time() - cpu,
+                peak_memory_mb=peak,
+                max_rss_mb=_max_rss_mb()
+            )
+
+            if profiler is not None:
+                profiles[name] = self._profile_summary(name, profiler)
+
+    def _profile_summary(self, name, profiler):
+        if self.profile_dir:
+            Path(self.profile_dir).mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(Path(self.profile_dir) / f"{name}.prof")
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP_N)
+        return out.getvalue()
+
+    # -----------------------------
+    # State
+    # -----------------------------
+    def build_state(self, df_raw=None, segment_keys=None):
+        """
+        Build state_df from df_raw, or from config data.path (streamed when
+        data.chunksize is set, served from the state cache when enabled).
+        """
+        data_cfg = self.config["data"]
+        if "state_builder" not in self.config:
+            return self._state_from_time_series(df_raw)
+
+        state_cfg = self.config["state_builder"]
+        params = dict(
+            date_column=state_cfg["date_column"],
+            time_unit=state_cfg["time_unit"],
+            aggregation_config=state_cfg["aggregations"],
+            date_format=state_cfg.get("date_format"),
+            segment_keys=segment_keys,
+            week_start=state_cfg.get("week_start", "monday"),
+            timezone=state_cfg.get("timezone")
+        )
+        backend = state_cfg.get("backend", "pandas")
+
+        if df_raw is not None:
+            return build_system_state(df_raw=df_raw, backend=backend, **params)
+
+        def build():
+            if data_cfg.get("chunksize") and not data_cfg.get("store"):
+                return build_system_state_chunked(data_cfg["path"], chunksize=data_cfg["chunksize"], **params)
+            return build_system_state(df_raw=self._read_raw(segment_keys), backend=backend, **params)
+
+        if self.state_cache is None:
+            return build()
+
+        return self.state_cache.get_or_build(
+            data_cfg["path"], {**state_cfg, "segment_keys": segment_keys, "source": self._raw_source()}, build
+        )
+
+    def _raw_source(self):
+        """How build_state reads data.path (part of the state cache key)."""
+        data_cfg = self.config["data"]
+        if data_cfg.get("store"):
+            return {"mode": "store", "store": str(Path(data_cfg["store"]).resolve()), "version": STORE_VERSION}
+        if data_cfg.get("chunksize"):
+            return {"mode": "chunked"}
+        return {"mode": "ingest", "ingest": data_cfg.get("ingest")}
+
+    def _state_from_time_series(self, df_raw=None):
+        """
+        Use cases without a state_builder section supply one row per time
+        unit already (data.time_column); integer time columns are day numbers.
+        """
+        time_column = self.config["data"]["time_column"]
+        columns = [time_column] + self.config["stage1"]["features"]
+
+        if df_raw is None and self.config["data"].get("store"):
+            df_raw = open_store(self.config["data"]["path"], self.config["data"]["store"], columns)
+        elif df_raw is None:
+            df_raw = pd.read_csv(self.config["data"]["path"], usecols=columns)
+
+        state_df = df_raw[columns].rename(columns={time_column: "time"})
+        if pd.api.types.is_integer_dtype(state_df["time"]):
+            state_df["time"] = pd.to_datetime(state_df["time"], unit="D")
+
+        return state_df.sort_values("time").reset_index(drop=True)
+
+    def _read_raw(self, segment_keys=None):
+        """
+        Raw CSV, read at most once per run (global and segmented state share
+        it) with column projection and the data.ingest dtype plan; or, when
+        data.store is set, the needed columns mapped from the columnar raw
+        store (converted from the CSV on first use, see core.raw_store).
+
+        The read carries the configured segment keys plus any requested
+        ones; a request for keys outside the memoised read reads again.
+        """
+        data_cfg = self.config["data"]
+        state_cfg = self.config["state_builder"]
+        keys = tuple(dict.fromkeys([*(state_cfg.get("segment_keys") or []), *(segment_keys or [])]))
+
+        if self._raw is not None and self._raw[0] == keys:
+            return self._raw[1]
+
+        if data_cfg.get("store"):
+            columns = [state_cfg["date_column"]] + list(keys) + list(state_cfg["aggregations"])
+            df_raw = open_store(data_cfg["path"], data_cfg["store"], columns)
+            self.ingest_report = None
+        else:
+            df_raw, self.ingest_report = read_raw(
+                data_cfg["path"],
+                state_cfg,
+                segment_keys=list(keys),
+                ingest_cfg=data_cfg.get("ingest")
+            )
+        self._raw = (keys, df_raw)
+        return df_raw
+
+    def release_raw(self):
+        """Drop the memoised raw read (run() does so once it finishes)."""
+        self._raw = None
+
+    # -----------------------------
+    # Run
+    # -----------------------------
+    def run(self, df_raw=None, state_df=None):
+        """
+        Run the pipeline on df_raw, a prebuilt state_df, or config data.path.
+        Stages 2–5 only run when the Stage 1 decision gate says proceed.
+        """
+        try:
+            return self._run(df_raw, state_df)
+        finally:
+            self.release_raw()
+
+    def _run(self, df_raw, state_df):
+        timings, profiles = {}, {}
+
+        with self._stage("state", timings, profiles):
+            if state_df is None:
+                state_df = self.build_state(df_raw)
+
+        result = self.score(state_df, timings, profiles)
+
+        if self.segment_keys:
+            with self._stage("segments", timings, profiles):
+                result.segments = self.score_segments(self.build_state(df_raw, self.segment_keys))
+
+        return self.run_downstream(result)
+
+    def score(self, state_df, timings=None, profiles=None):
+        """Stage 1 on a built state_df; the result carries the decision gate."""
+        stage1_cfg = self.config["stage1"]
+        timings = {} if timings is None else timings
+        profiles = {} if profiles is None else profiles
+
+        with self._stage("stage1", timings, profiles):
+            index = (
+                WindowStatsIndex(
+                    state_df, "time", stage1_cfg["features"],
+                    cross_products=stage1_cfg.get("window_cross_products", "auto")
+                )
+                if stage1_cfg.get("window_index") else None
+            )
+            stage1_out = run_stage1_v2(
+                df=state_df,
+                time_column="time",
+                feature_list=stage1_cfg["features"],
+                feature_bounds=stage1_cfg.get("feature_bounds", {}),
+                window_days=stage1_cfg.get("window_days", 14),
+                alpha=stage1_cfg.get("alpha", 0.01),
+                weights=stage1_cfg.get("risk_weights"),
+                index=index
+            )
+
+        return PipelineResult(
+            state_df=state_df, stage1=stage1_out, timings=timings, profiles=profiles, window_index=index
+        )
+
+    @property
+    def segment_keys(self):
+        """Configured state_builder.segment_keys (empty without a state_builder)."""
+        return list(self.config.get("state_builder", {}).get("segment_keys") or [])
+
+    def score_segments(self, segment_state_df):
+        """Stage 1 per segment on a state built with the configured segment keys."""
+        stage1_cfg = self.config["stage1"]
+        return run_stage1_segmented(
+            df=segment_state_df,
+            time_column="time",
+            segment_keys=self.segment_keys,
+            feature_list=stage1_cfg["features"],
+            feature_bounds=stage1_cfg.get("feature_bounds", {}),
+            window_days=stage1_cfg.get("window_days", 14),
+            alpha=stage1_cfg.get("alpha", 0.01),
+            weights=stage1_cfg.get("risk_weights"),
+            n_jobs=stage1_cfg.get("segment_jobs", 1)
+        )
+
+    def run_downstream(self, result, narrate=True):
+        """
+        Stages 2–5 for a scored result when its gate says proceed; on stop
+        only the Stage 4 summary of the Stage 1 outcome is produced.
+        narrate=False skips the Stage 4 LLM call on proceed.
+        """
+        stage1_cfg = self.config["stage1"]
+        stage1_out = result.stage1
+        timings, profiles = result.timings, result.profiles
+
+        if result.decision_gate == "stop":
+            with self._stage("stage4", timings, profiles):
+                result.stage4 = run_stage4_llm(stage1_output=stage1_out)
+            return result
+
+        with self._stage("stage2", timings, profiles):
+            result.stage2 = run_stage2_v2(
+                state_df=result.state_df,
+                stage1_output=stage1_out,
+                features=stage1_cfg["features"],
+                baseline_days=stage1_cfg.get("window_days", 14),
+                index=result.window_index
+            )
+
+        with self._stage("stage3", timings, profiles):
+            result.stage3 = run_stage3_v2(
+                stage2_output=result.stage2,
+                stage1_output=stage1_out,
+                hypotheses_config=self.config["stage3"]["hypotheses"]
+            )
+
+        if narrate:
+            with self._stage("stage4", timings, profiles):
+                result.stage4 = run_stage4_llm(
+                    stage1_output=stage1_out,
+                    stage2_output=result.stage2,
+                    stage3_output=result.stage3,
+                    client=self.narrative_client,
+                    cache=self.narrative_cache,
+                    model=self.stage4_cfg.get("model", MODEL),
+                    max_tokens=self.stage4_cfg.get("max_tokens", MAX_TOKENS)
+                )
+
+        with self._stage("stage5", timings, profiles):
+            result.stage5 = compute_decision_metrics(result.stage3)
+
+        return result
+
+    def narrate_batch(self, results):
+        """
+        Stage 4 narratives for many results scored with narrate=False,
+        generated concurrently: at most stage4.concurrency calls in flight,
+        each limited to stage4.timeout_seconds and retried stage4.retries
+        times. Stop results keep their Stage 1 summary.
+        """
+        pending = [result for result in results if result.decision_gate == "proceed"]
+        if not pending:
+            return results
+
+        timings = {}
+        with self._stage("stage4_batch", timings, {}):
+            narratives = run_stage4_batch(
+                [(result.stage1, result.stage2, result.stage3) for result in pending],
+                client=self.narrative_async_client,
+                cache=self.narrative_cache,
+                concurrency=self.stage4_cfg.get("concurrency", 8),
+                timeout=self.stage4_cfg.get("timeout_seconds", 30.0),
+                retries=self.stage4_cfg.get("retries", 2),
+                model=self.stage4_cfg.get("model", MODEL),
+                max_tokens=self.stage4_cfg.get("max_tokens", MAX_TOKENS)
+            )
+
+        for result, narrative in zip(pending, narratives):
+            result.stage4 = narrative
+            result.timings.update(timings)
+
+        return results
@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from core.ingest import DEFAULT_CHUNKSIZE
+from core.state_cache import _file_identity
+
+
+STORE_VERSION = 1
+META_FILE = "meta.json"
+
+
+# -----------------------------
+# Conversion
+# -----------------------------
+class _ColumnWriter:
+    """
+    Appends one column, chunk by chunk, to a flat binary file.
+
+    Numeric and boolean columns are written as-is (a later chunk with a
+    wider dtype, e.g. ints that gain a NaN, rewrites what was written so
+    far); text columns are written as int32 category codes with the
+    (finally sorted) categories kept for the metadata header.
+    """
+
+    def __init__(self, directory, index, name):
+        self.name = name
+        self.file = f"c{index}.bin"
+        self.path = Path(directory) / self.file
+        self.dtype = None
+        self.categories = None
+        self._known = None
+        self.rows = 0
+
+    def write(self, values):
+        if self.dtype is None:
+            text = not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_bool_dtype(values))
+            self.dtype = np.dtype(np.int32) if text else values.dtype
+            self.categories = [] if text else None
+            self._known = set() if text else None
+
+        if self.categories is not None:
+            array = self._encode(values)
+        else:
+            if not pd.api.types.is_numeric_dtype(values):
+                raise ValueError(
+                    f"Column '{self.name}' turns from numeric to text after {self.rows} rows; "
+                    "convert with a larger chunksize"
+                )
+            array = values.to_numpy()
+            wider = np.result_type(self.dtype, array.dtype)
+            if wider != self.dtype:
+                self._widen(wider)
+
+        with open(self.path, "ab") as f:
+            f.write(np.ascontiguousarray(array, dtype=self.dtype).tobytes())
+        self.rows += len(array)
+
+    def _encode(self, values):
+        for value in pd.unique(values.dropna()):
+            if value not in self._known:
+                self._known.add(value)
+                self.categories.append(value)
+        return pd.Categorical(values, categories=self.categories).codes.astype(np.int32)
+
+    def _widen(self, dtype):
+        existing = np.fromfile(self.path, dtype=self.dtype) if self.rows else np.empty(0, self.dtype)
+        existing.astype(dtype).tofile(self.path)
+        self.dtype = dtype
+
+    def finish(self):
+        """Sort the categories (as a categorical read of the CSV would) and remap the codes."""
+        if not self.categories:
+            return
+        order = np.argsort(np.array(self.categories, dtype=object), kind="stable")
+        ranks = np.empty(len(order), dtype=np.int32)
+        ranks[order] = np.arange(len(order), dtype=np.int32)
+
+        codes = np.memmap(self.path, dtype=self.dtype, mode="r+", shape=(self.rows,))
+        codes[:] = np.where(codes >= 0, ranks[codes], -1)
+        codes.flush()
+        del codes
+
+        self.categories = [self.categories[i] for i in order]
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "file": self.file,
+            "dtype": self.dtype.str,
+            "categories": [str(value) for value in self.categories] if self.categories is not None else None,
+        }
+
+
+def convert(csv_path, store_dir, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    One-time conversion of a raw CSV into a memory-mapped columnar store:
+    one flat binary file per column plus a meta.json header (source file
+    identity, row count, dtypes, categories of text columns).
+
+    The store is written next to store_dir and swapped in when complete,
+    so readers never see a partial store. Returns the metadata.
+    """
+    store_dir = Path(store_dir)
+    staging = store_dir.with_name(f"{store_dir.name}.tmp{os.getpid()}")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+
+    start = time.perf_counter()
+    writers = None
+    try:
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            if writers is None:
+                writers = [_ColumnWriter(staging, i, name) for i, name in enumerate(chunk.columns)]
+            for writer in writers:
+                writer.write(chunk[writer.name])
+
+        if writers is None:
+            header = pd.read_csv(csv_path, nrows=0)
+            writers = [_ColumnWriter(staging, i, name) for i, name in enumerate(header.columns)]
+            for writer in writers:
+                writer.write(header[writer.name])
+
+        for writer in writers:
+            writer.finish()
+
+        meta = {
+            "version": STORE_VERSION,
+            "source": _file_identity(csv_path),
+            "rows": writers[0].rows if writers else 0,
+            "columns": [writer.describe() for writer in writers],
+            "convert_seconds": round(time.perf_counter() - start, 3),
+        }
+        with open(staging / META_FILE, "w") as f:
+            json.dump(meta, f, indent=2)
+
+        shutil.rmtree(store_dir, ignore_errors=True)
+        os.replace(staging, store_dir)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    return meta
+
+
+# -----------------------------
+# Reading
+# -----------------------------
+def read_meta(store_dir):
+    with open(Path(store_dir) / META_FILE) as f:
+        return json.load(f)
+
+
+def is_current(store_dir, csv_path):
+    """True when store_dir holds a complete store of csv_path as it is now."""
+    try:
+        meta = read_meta(store_dir)
+    except (OSError, ValueError):
+        return False
+
+    if meta.get("version") != STORE_VERSION:
+        return False
+    if not Path(csv_path).exists():
+        # Source gone: the store is all there is
+        return True
+    return meta["source"] == _file_identity(csv_path)
+
+
+def read_store(store_dir, columns=None):
+    """
+    Zero-copy DataFrame over a store made by convert.
+
+    Columns are read-only np.memmap views, so only the pages a stage
+    touches are read, and processes reading the same store share them
+    through the OS page cache. Text columns come back as categoricals over
+    the mapped codes. columns restricts the load; names the store does not
+    have are skipped (state validation reports them).
+    """
+    meta = read_meta(store_dir)
+    by_name = {column["name"]: column for column in meta["columns"]}
+    names = list(by_name) if columns is None else [c for c in dict.fromkeys(columns) if c in by_name]
+
+    data = {}
+    for name in names:
+        column = by_name[name]
+        dtype = np.dtype(column["dtype"])
+        values = (
+            np.memmap(Path(store_dir) / column["file"], dtype=dtype, mode="r", shape=(meta["rows"],))
+            if meta["rows"] else np.empty(0, dtype)
+        )
+        if column["categories"] is not None:
+            values = pd.Categorical.from_codes(values, column["categories"])
+        data[name] = values
+
+    return pd.DataFrame(data, copy=False)
+
+
+def open_store(csv_path, store_dir, columns=None, chunksize=DEFAULT_CHUNKSIZE):
+    """read_store, converting csv_path first when the store is missing or stale."""
+    if not is_current(store_dir, csv_path):
+        convert(csv_path, store_dir, chunksize)
+    return read_store(store_dir, columns)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Convert a raw CSV into a memory-mapped columnar store")
+    parser.add_argument("csv", help="Raw CSV file")
+    parser.add_argument("--store", default=None,
+                        help="Store directory (default: .caden_cache/raw_store/<csv name>)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    store_dir = args.store or Path(".caden_cache/raw_store") / Path(args.csv).stem
+
+    meta = convert(args.csv, store_dir, args.chunksize)
+    size_mb = sum(f.stat().st_size for f in Path(store_dir).iterdir()) / 1024 ** 2
+    print(
+        f"{args.csv} -> {store_dir}: {meta['rows']} rows, {len(meta['columns'])} columns, "
+        f"{size_mb:.1f} MB in {meta['convert_seconds']}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+from typing import NamedTuple
+
+import numpy as np
+
+
+ZONE_LABELS = {0.0: "expected", 0.5: "caution", 1.0: "critical"}
+
+
+class CompiledBounds(NamedTuple):
+    """
+    feature_bounds config compiled into threshold arrays (one slot per feature).
+
+    Lower-bound features are stored negated (sign = -1) so every feature
+    is scored with the same "value above threshold" comparison.
+    """
+    features: list
+    sign: np.ndarray
+    expected: np.ndarray
+    caution: np.ndarray
+    critical: np.ndarray
+
+
+def compile_feature_bounds(feature_bounds):
+    """
+    Compile a feature_bounds config section once.
+
+    Each feature needs expected_min/caution_min (lower-bound KPIs such as
+    inventory or fulfillment) or expected_max/caution_max (upper-bound KPIs
+    such as lead time or backorders). critical_min/critical_max are optional.
+    """
+    features = list(feature_bounds)
+    k = len(features)
+
+    sign = np.ones(k)
+    expected = np.empty(k)
+    caution = np.empty(k)
+    critical = np.full(k, np.nan)
+
+    for i, (feature, bounds) in enumerate(feature_bounds.items()):
+        if "expected_min" in bounds:
+            suffix = "min"
+            sign[i] = -1.0
+        elif "expected_max" in bounds:
+            suffix = "max"
+        else:
+            raise ValueError(
+                f"Feature bounds for '{feature}' need expected_min or expected_max"
+            )
+
+        if f"caution_{suffix}" not in bounds:
+            raise ValueError(f"Feature bounds for '{feature}' missing 'caution_{suffix}'")
+
+        expected[i] = sign[i] * bounds[f"expected_{suffix}"]
+        caution[i] = sign[i] * bounds[f"caution_{suffix}"]
+        if f"critical_{suffix}" in bounds:
+            critical[i] = sign[i] * bounds[f"critical_{suffix}"]
+
+    return CompiledBounds(features, sign, expected, caution, critical)
+
+
+def row_zone_scores(values, compiled):
+    """
+    Zone score of every value: 0.0 expected, 0.5 caution, 1.0 critical.
+
+    values: (..., n, k) with columns in compiled.features order
+    Returns (scores, breaches): scores as floats, breaches as a boolean
+    mask of values beyond the critical_min/critical_max limit.
+
+    Missing values score as critical, as in the per-value scorer.
+    """
+    signed = np.asarray(values, dtype=float) * compiled.sign
+
+    scores = (
+        0.5 * ~(signed <= compiled.expected) +
+        0.5 * ~(signed <= compiled.caution)
+    )
+    breaches = ~np.isnan(compiled.critical) & ~(signed <= compiled.critical)
+
+    return scores, breaches
+
+
+def summarize_zones(scores, breaches):
+    """
+    Reduce per-row zone scores over the window axis.
+
+    scores, breaches: (..., n, k)
+    Returns (mean_scores, max_scores, breach_counts), each (..., k)
+    """
+    return (
+        scores.mean(axis=-2),
+        scores.max(axis=-2),
+        breaches.sum(axis=-2),
+    )
+
+
+def zone_hits(features, max_scores):
+    return {
+        feature: ZONE_LABELS[float(score)]
+        for feature, score in zip(features, max_scores)
+    }
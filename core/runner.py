@@ -0,0 +1,182 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from core.pipeline import Pipeline
+from core.raw_store import open_store
+from core.service import json_default
+from utils.config import load_config
+
+
+# Column offsets inside a shared block are aligned to this many bytes
+_ALIGN = 64
+
+
+# -----------------------------
+# Shared-memory frames
+# -----------------------------
+def share_frame(df):
+    """
+    Copy a DataFrame into one shared-memory block, column by column.
+
+    Numeric and datetime columns are stored as-is; anything else is stored
+    as categorical codes with its categories kept in the (small, pickled)
+    descriptor. Returns (shm, descriptor); the caller owns and must unlink
+    the block.
+    """
+    arrays, layout, offset = [], [], 0
+
+    for column in df.columns:
+        values = df[column]
+        categories = None
+
+        if not (pd.api.types.is_numeric_dtype(values) or pd.api.types.is_datetime64_dtype(values)):
+            values = values.astype("category")
+            categories = list(values.cat.categories)
+            values = values.cat.codes
+
+        array = np.ascontiguousarray(values.to_numpy())
+        arrays.append(array)
+        layout.append((column, array.dtype.str, offset, categories))
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for array, (_, dtype, start, _) in zip(arrays, layout):
+        np.ndarray(array.shape, dtype=dtype, buffer=shm.buf, offset=start)[:] = array
+
+    return shm, {"name": shm.name, "rows": len(df), "layout": layout}
+
+
+def attach_frame(descriptor):
+    """
+    Zero-copy DataFrame over a block made by share_frame.
+    Returns (shm, df); keep shm open for as long as df is used.
+    """
+    shm = shared_memory.SharedMemory(name=descriptor["name"])
+
+    columns = {}
+    for column, dtype, start, categories in descriptor["layout"]:
+        values = np.ndarray(descriptor["rows"], dtype=dtype, buffer=shm.buf, offset=start)
+        values.flags.writeable = False
+        if categories is not None:
+            values = pd.Categorical.from_codes(values, categories)
+        columns[column] = values
+
+    return shm, pd.DataFrame(columns, copy=False)
+
+
+# -----------------------------
+# Use cases
+# -----------------------------
+def _raw_columns(config):
+    """Raw columns a use case reads from data.path."""
+    if "state_builder" not in config:
+        return [config["data"]["time_column"]] + config["stage1"]["features"]
+
+    state_cfg = config["state_builder"]
+    return (
+        [state_cfg["date_column"]] +
+        list(state_cfg.get("segment_keys") or []) +
+        list(state_cfg["aggregations"])
+    )
+
+
+def _run_usecase(config_path, config, descriptor):
+    start = time.perf_counter()
+    report = {"config": config_path, "usecase": config.get("usecase", {}).get("name", config_path)}
+
+    try:
+        shm, df_raw = attach_frame(descriptor)
+        try:
+            pipeline = Pipeline(config)
+            if "state_builder" in config:
+                result = pipeline.run(df_raw=df_raw)
+            else:
+                result = pipeline.run(state_df=pipeline.build_state(df_raw))
+        finally:
+            del df_raw
+            shm.close()
+
+        report.update(status="ok", **result.to_dict())
+    except Exception as exc:
+        report.update(status="error", error=f"{type(exc).__name__}: {exc}")
+
+    report["wall_seconds"] = time.perf_counter() - start
+    return report
+
+
+def run_usecases(config_paths, n_jobs=None):
+    """
+    Run several use-case pipelines concurrently.
+
+    Each distinct data.path is read once (the union of the columns its use
+    cases need, from the columnar raw store when data.store is set) into
+    shared memory; worker processes attach to it without
+    copying and run their pipeline. Returns a report with one entry per
+    use case, in input order, and the total wall time.
+    """
+    start = time.perf_counter()
+    configs = [load_config(path) for path in config_paths]
+
+    columns_by_path, stores = {}, {}
+    for config in configs:
+        columns = columns_by_path.setdefault(config["data"]["path"], [])
+        columns.extend(c for c in _raw_columns(config) if c not in columns)
+        if config["data"].get("store"):
+            stores[config["data"]["path"]] = config["data"]["store"]
+
+    blocks, descriptors = [], {}
+    try:
+        for path, columns in columns_by_path.items():
+            df_raw = open_store(path, stores[path], columns) if path in stores else pd.read_csv(path, usecols=columns)
+            shm, descriptors[path] = share_frame(df_raw)
+            blocks.append(shm)
+        load_seconds = time.perf_counter() - start
+
+        n_jobs = n_jobs or min(len(configs), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            futures = [
+                pool.submit(_run_usecase, path, config, descriptors[config["data"]["path"]])
+                for path, config in zip(config_paths, configs)
+            ]
+            results = [future.result() for future in futures]
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+
+    return {
+        "wall_seconds": time.perf_counter() - start,
+        "load_seconds": load_seconds,
+        "datasets": len(descriptors),
+        "jobs": n_jobs,
+        "usecases": results,
+    }
+
+
+def write_report(report, path):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=json_default)
+
+
+def print_report(report):
+    print(
+        f"{len(report['usecases'])} use cases, {report['datasets']} datasets, "
+        f"{report['jobs']} jobs: {report['wall_seconds']:.2f}s "
+        f"(data load {report['load_seconds']:.2f}s)"
+    )
+    for entry in report["usecases"]:
+        if entry["status"] != "ok":
+            print(f"  {entry['usecase']}: {entry['error']}")
+            continue
+        stage1 = entry["stage1"]
+        print(
+            f"  {entry['usecase']}: {stage1.get('anomaly_level')} "
+            f"(risk {stage1.get('risk_score')}, gate {entry['decision_gate']}) "
+            f"{entry['wall_seconds']:.2f}s"
+        )
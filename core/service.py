@@ -0,0 +1,277 @@
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from core.state_builder import StateAccumulator
+
+
+# Latencies kept per endpoint for the /metrics percentiles
+LATENCY_WINDOW = 1000
+
+
+def json_default(obj):
+    """json.dumps default for pandas / numpy values in stage outputs."""
+    if isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Not JSON serializable: {type(obj).__name__}")
+
+
+def _replace_rows(state_df, updated, keys):
+    """state_df with its rows for the (time, segment) keys in updated replaced."""
+    stale = pd.MultiIndex.from_frame(state_df[keys]).isin(pd.MultiIndex.from_frame(updated[keys]))
+    return (
+        pd.concat([state_df[~stale], updated])
+        .sort_values(keys[1:] + keys[:1])
+        .reset_index(drop=True)
+    )
+
+
+class ScoringService:
+    """
+    Warm CADEN scorer: config, imports and state are loaded once and
+    every request reuses them.
+
+    The state is built the way a batch run builds it (data.store or the
+    ingest read, the state cache, state_builder.backend), together with
+    the per-segment state when segment_keys are configured. On the first
+    append the raw data is folded into StateAccumulators, so appended
+    slices merge into the existing time buckets exactly as a full rebuild
+    would; time-series configs (no state_builder) take appended rows as
+    state rows.
+
+    self.lock guards the state: appends, and the snapshot each score
+    takes before running the stages (and the LLM calls) outside it.
+    The request counters have their own lock, so /health and /metrics
+    never wait on scoring.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.started = time.time()
+
+        self.segment_keys = pipeline.segment_keys
+        try:
+            self.state_df = pipeline.build_state()
+            self.segment_state_df = (
+                pipeline.build_state(segment_keys=self.segment_keys) if self.segment_keys else None
+            )
+            self.ingest_report = pipeline.ingest_report
+        finally:
+            # Read again when the first append needs it
+            pipeline.release_raw()
+        self.accumulator = None
+        self.segment_accumulator = None
+
+        self.requests = defaultdict(int)
+        self.errors = defaultdict(int)
+        self.latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    def _snapshot(self, end_date=None):
+        with self.lock:
+            state_df, segment_state_df = self.state_df, self.segment_state_df
+
+        if end_date is not None:
+            state_df = state_df[state_df["time"] <= pd.Timestamp(end_date)]
+            if state_df.empty:
+                raise ValueError(f"No state at or before {end_date}")
+            if segment_state_df is not None:
+                segment_state_df = segment_state_df[segment_state_df["time"] <= pd.Timestamp(end_date)]
+        return state_df, segment_state_df
+
+    def _score(self, end_date=None, narrative=True):
+        state_df, segment_state_df = self._snapshot(end_date)
+
+        result = self.pipeline.score(state_df)
+        if segment_state_df is not None:
+            result.segments = self.pipeline.score_segments(segment_state_df)
+        return self.pipeline.run_downstream(result, narrate=narrative)
+
+    def score(self, end_date=None, narrative=True):
+        """
+        Stages 1–5 for the window ending at end_date (default: latest
+        bucket); narrative=False skips the Stage 4 LLM call.
+        """
+        return self._score(end_date, narrative).to_dict()
+
+    def score_batch(self, end_dates, narrative=True):
+        """
+        score() for each end date; the Stage 4 narratives of the whole
+        batch are generated concurrently (Pipeline.narrate_batch).
+        """
+        results = [self._score(end_date, narrative=False) for end_date in end_dates]
+        if narrative:
+            self.pipeline.narrate_batch(results)
+        return [result.to_dict() for result in results]
+
+    def _make_accumulator(self, df_raw, segment_keys=None):
+        state_cfg = self.pipeline.config["state_builder"]
+        accumulator = StateAccumulator(
+            date_column=state_cfg["date_column"],
+            time_unit=state_cfg["time_unit"],
+            aggregation_config=state_cfg["aggregations"],
+            date_format=state_cfg.get("date_format"),
+            segment_keys=segment_keys,
+            week_start=state_cfg.get("week_start", "monday"),
+            timezone=state_cfg.get("timezone")
+        )
+        accumulator.update(df_raw)
+        return accumulator
+
+    def _seed_accumulators(self):
+        """Fold the raw data, read through the pipeline, into the accumulators."""
+        try:
+            df_raw = self.pipeline._read_raw()
+            self.accumulator = self._make_accumulator(df_raw)
+            if self.segment_keys:
+                self.segment_accumulator = self._make_accumulator(df_raw, self.segment_keys)
+        finally:
+            self.pipeline.release_raw()
+
+    def append(self, rows):
+        """Fold raw rows into the state; only the buckets they touch are rebuilt."""
+        df_rows = pd.DataFrame(rows)
+
+        with self.lock:
+            if "state_builder" not in self.pipeline.config:
+                updated = self.pipeline.build_state(df_rows)
+                self.state_df = _replace_rows(self.state_df, updated, ["time"])
+                return len(updated)
+
+            if self.accumulator is None:
+                self._seed_accumulators()
+
+            updated = self.accumulator.finalize(self.accumulator.update(df_rows))
+            self.state_df = _replace_rows(self.state_df, updated, ["time"])
+
+            if self.segment_accumulator is not None:
+                self.segment_state_df = _replace_rows(
+                    self.segment_state_df,
+                    self.segment_accumulator.finalize(self.segment_accumulator.update(df_rows)),
+                    ["time"] + self.segment_keys
+                )
+        return len(updated)
+
+    # -----------------------------
+    # Health / metrics
+    # -----------------------------
+    def health(self):
+        state_df = self.state_df
+        return {
+            "status": "ok",
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "state_rows": len(state_df),
+            "latest_time": state_df["time"].max() if len(state_df) else None,
+        }
+
+    def metrics(self):
+        with self.stats_lock:
+            counts = {
+                name: (count, self.errors[name], np.array(self.latencies[name]) * 1000)
+                for name, count in self.requests.items()
+            }
+
+        endpoints = {}
+        for name, (count, errors, latencies) in counts.items():
+            endpoints[name] = {
+                "requests": count,
+                "errors": errors,
+                "latency_ms_p50": round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                "latency_ms_p95": round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+                "latency_ms_max": round(float(latencies.max()), 2) if len(latencies) else None,
+            }
+        return {**self.health(), "endpoints": endpoints}
+
+    def handle(self, method, path, body):
+        """Dispatch one request; returns (status, payload)."""
+        narrative = body.get("narrative", True)
+        routes = {
+            ("GET", "/health"): lambda: self.health(),
+            ("GET", "/metrics"): lambda: self.metrics(),
+            ("POST", "/score"): lambda: self.score(body.get("end_date"), narrative),
+            ("POST", "/score/batch"): lambda: self.score_batch(body["end_dates"], narrative),
+            ("POST", "/append"): lambda: {
+                "buckets_updated": self.append(body["rows"]),
+                **(self.score(narrative=narrative) if body.get("score", True) else {}),
+            },
+        }
+
+        route = routes.get((method, path))
+        if route is None:
+            return 404, {"error": f"No route for {method} {path}"}
+
+        start = time.perf_counter()
+        try:
+            status, payload = 200, route()
+        except (KeyError, ValueError, TypeError) as exc:
+            status, payload = 400, {"error": f"{type(exc).__name__}: {exc}"}
+        except Exception as exc:
+            status, payload = 500, {"error": f"{type(exc).__name__}: {exc}"}
+
+        with self.stats_lock:
+            self.requests[path] += 1
+            if status != 200:
+                self.errors[path] += 1
+            self.latencies[path].append(time.perf_counter() - start)
+        return status, payload
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _respond(self, method):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length)) if length else {}
+            except json.JSONDecodeError as exc:
+                status, payload = 400, {"error": f"Invalid JSON: {exc}"}
+            else:
+                if isinstance(body, dict):
+                    status, payload = service.handle(method, self.path.split("?")[0], body)
+                else:
+                    status, payload = 400, {"error": "Request body must be a JSON object"}
+
+            data = json.dumps(payload, default=json_default).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._respond("GET")
+
+        def do_POST(self):
+            self._respond("POST")
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(pipeline, host="127.0.0.1", port=8765):
+    """Build the warm service and serve until interrupted."""
+    service = ScoringService(pipeline)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+
+    print(f"CADEN service on http://{host}:{port} ({len(service.state_df)} state rows)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nService stopped.")
+    finally:
+        server.server_close()
@@ -1,9 +1,37 @@
 import numpy as np
-from scipy.stats import chi2
 
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from datetime import timedelta
 
+from core.hotelling import RollingMoments, estimate_moments, t2_scores
+from core.risk_zones import (
+    compile_feature_bounds,
+    row_zone_scores,
+    summarize_zones,
+    zone_hits,
+)
+from core.thresholds import chi2_threshold
+
+
+DEFAULT_WEIGHTS = {
+    "t2": 0.35,
+    "persistence": 0.25,
+    "risk_zone": 0.25,
+}
+
+# T² trend over the window, as the fitted rise across the window
+# relative to the chi-square threshold
+TREND_SHARP = 0.5
+TREND_MILD = 0.15
+
+# Segments scored per batched block (and per worker task when n_jobs > 1)
+SEGMENT_BLOCK_SIZE = 2000
+
+# Rolling backfill re-derives the window moments exactly every N steps
+# to keep floating-point drift from the rank-one updates bounded.
+ROLLING_REFRESH_EVERY = 500
+
 
 def clip(x, low=0.0, high=1.0):
     return max(low, min(x, high))
@@ -14,28 +42,143 @@ def compute_risk_zone_score(values, bounds):
     values: array-like of feature values in the window
     bounds: dict with expected / caution / critical thresholds
     """
-    zone_scores = []
+    compiled = compile_feature_bounds({"value": bounds})
+    scores, _ = row_zone_scores(np.asarray(values, dtype=float)[:, None], compiled)
 
-    for v in values:
-        # Lower-bound features (inventory, fulfillment, etc.)
-        if "expected_min" in bounds:
-            if v >= bounds["expected_min"]:
-                zone_scores.append(0.0)
-            elif v >= bounds["caution_min"]:
-                zone_scores.append(0.5)
-            else:
-                zone_scores.append(1.0)
+    return np.mean(scores), scores.max()
 
-        # Upper-bound features (lead_time, backorders, etc.)
-        else:
-            if v <= bounds["expected_max"]:
-                zone_scores.append(0.0)
-            elif v <= bounds["caution_max"]:
-                zone_scores.append(0.5)
-            else:
-                zone_scores.append(1.0)
 
-    return np.mean(zone_scores), max(zone_scores)
+def classify_trend(T2, threshold):
+    """
+    Direction of T² across the window (rows in time order):
+    sharp_increase, increasing, stable or decreasing.
+    """
+    n = len(T2)
+    if n < 3:
+        return "stable"
+
+    slope = np.polyfit(np.arange(n), T2, 1)[0]
+    rise = slope * (n - 1) / threshold
+
+    if rise >= TREND_SHARP:
+        return "sharp_increase"
+    elif rise >= TREND_MILD:
+        return "increasing"
+    elif rise <= -TREND_MILD:
+        return "decreasing"
+    return "stable"
+
+
+def _insufficient_data_output(window_start, window_end):
+    return {
+        "anomaly_level": "none",
+        "risk_score": 0.0,
+        "trend": "stable",
+        "decision_gate": "stop",
+        "reason": "Insufficient data in analysis window",
+        "window_start": window_start,
+        "window_end": window_end,
+        "t2_summary": {
+            "max": 0.0,
+            "mean": 0.0,
+            "exceedance_count": 0
+        }
+    }
+
+
+def _score_window(T2, threshold, zone_rows, breach_rows, bounds, weights):
+    """
+    Steps 4-11 of Stage 1 for one window whose T² values and per-row
+    zone scores (see core.risk_zones.row_zone_scores) are known.
+    Returns the Stage 1 fields plus the (T2, persistence, risk zone)
+    signal scores.
+    """
+
+    # -----------------------------
+    # STEP 4 — T² summary
+    # -----------------------------
+    T2_mean = float(np.mean(T2))
+    T2_max = float(np.max(T2))
+    exceedance_count = int(np.sum(T2 > threshold))
+
+    # -----------------------------
+    # STEP 5 — T² score (Signal A)
+    # -----------------------------
+    T2_score = clip(
+        0.4 * (T2_mean / threshold) +
+        0.6 * (T2_max / threshold)
+    )
+
+    # -----------------------------
+    # STEP 6 — Persistence score (Signal B)
+    # -----------------------------
+    persistence_score = clip(exceedance_count / 5)
+
+    # -----------------------------
+    # STEP 7 — Risk zone score (Signal C)
+    # -----------------------------
+    mean_scores, max_scores, breach_counts = summarize_zones(zone_rows, breach_rows)
+    risk_zone_hits = zone_hits(bounds.features, max_scores)
+
+    risk_zone_score = clip(float(np.mean(mean_scores))) if bounds.features else 0.0
+
+    critical_count = int(np.sum(max_scores == 1.0))
+
+    # -----------------------------
+    # STEP 8 — Critical limit breaches
+    # -----------------------------
+    critical_breaches = {
+        feature: int(count)
+        for feature, count, limit in zip(bounds.features, breach_counts, bounds.critical)
+        if not np.isnan(limit)
+    }
+
+    # -----------------------------
+    # STEP 9 — Final risk score
+    # -----------------------------
+    risk_score = clip(
+        weights["t2"] * T2_score +
+        weights["persistence"] * persistence_score +
+        weights["risk_zone"] * risk_zone_score
+    )
+    # Risk override: many critical KPIs
+    risk_override = (risk_zone_score >= 0.6 and critical_count >= 2)
+
+    # -----------------------------
+    # STEP 10 — Anomaly level
+    # -----------------------------
+    if risk_override:
+        anomaly_level = "strong"
+    elif risk_score < 0.20:
+        anomaly_level = "none"
+    elif risk_score < 0.40:
+        anomaly_level = "marginal"
+    elif risk_score < 0.65:
+        anomaly_level = "moderate"
+    else:
+        anomaly_level = "strong"
+
+    # -----------------------------
+    # STEP 11 — Decision gate
+    # -----------------------------
+    decision_gate = "proceed" if anomaly_level in ["moderate", "strong"] else "stop"
+
+    return {
+        "anomaly_level": anomaly_level,
+        "risk_score": round(risk_score, 3),
+        "trend": classify_trend(T2, threshold),
+
+        "t2_summary": {
+            "mean": round(T2_mean, 3),
+            "max": round(T2_max, 3),
+            "threshold": round(float(threshold), 3),
+            "exceedance_count": exceedance_count
+        },
+
+        "risk_zone_hits": risk_zone_hits,
+        "critical_breaches": critical_breaches,
+        "decision_gate": decision_gate
+    }, (T2_score, persistence_score, risk_zone_score)
 
 
 def run_stage1_v2(
@@ -45,19 +188,20 @@ def run_stage1_v2(
     feature_bounds,
     window_days=14,
     alpha=0.01,
-    weights=None
+    weights=None,
+    index=None
 ):
     """
     CADEN Stage 1 v2
     Governed, windowed, risk-aware anomaly assessment
+
+    index: optional core.window_index.WindowStatsIndex over df and
+    feature_list, for callers that already hold one; without it the
+    window moments come straight from the window rows.
     """
 
     if weights is None:
-        weights = {
-            "t2": 0.35,
-            "persistence": 0.25,
-            "risk_zone": 0.25,
-        }
+        weights = DEFAULT_WEIGHTS
 
     # -----------------------------
     # STEP 0 — Select window
@@ -78,148 +222,295 @@ def run_stage1_v2(
     end_date = df[time_column].max()
     start_date = end_date - timedelta(days=window_days)
 
-    window_df = df[(df[time_column] >= start_date) &(df[time_column] <= end_date)]
+    if index is None:
+        window_df = df[(df[time_column] >= start_date) & (df[time_column] <= end_date)]
+    else:
+        lo, hi = index.window(start_date, end_date)
+        window_df = df.iloc[index.positions(lo, hi)]
     window_start = start_date
     window_end = end_date
 
     if window_df.empty or len(window_df) < 2:
-        return {
-            "anomaly_level": "none",
-            "risk_score": 0.0,
-            "decision_gate": "stop",
-            "reason": "Insufficient data in analysis window",
-            "window_start": window_start,
-            "window_end": window_end,
-            "t2_summary": {
-                "max": 0.0,
-                "mean": 0.0,
-                "exceedance_count": 0
-            }
-        }
+        return _insufficient_data_output(window_start, window_end)
 
 
     # -----------------------------
     # STEP 1 — Multivariate matrix
     # -----------------------------
-    X = window_df[feature_list].values
+    X = window_df[feature_list].to_numpy(dtype=float)
 
     # -----------------------------
     # STEP 2 — Hotelling T²
     # -----------------------------
-    mu = X.mean(axis=0)
-    Sigma = np.cov(X, rowvar=False)
-
-    # Numerical safety
-    Sigma += 1e-6 * np.eye(Sigma.shape[0])
-    Sigma_inv = np.linalg.inv(Sigma)
-
-    T2 = []
-    for x in X:
-        diff = x - mu
-        T2.append(diff.T @ Sigma_inv @ diff)
-
-    T2 = np.array(T2)
+    mu, Sigma = estimate_moments(X) if index is None else index.moments(lo, hi)
+    T2 = t2_scores(X, mu, Sigma)
 
     # -----------------------------
     # STEP 3 — Chi-square threshold
     # -----------------------------
     p = X.shape[1]
-    threshold = chi2.ppf(1 - alpha, p)
+    threshold = chi2_threshold(alpha, p)
 
     # -----------------------------
-    # STEP 4 — T² summary
+    # STEP 4-11 — Scores, level, gate
     # -----------------------------
-    T2_mean = float(np.mean(T2))
-    T2_max = float(np.max(T2))
-    exceedance_count = int(np.sum(T2 > threshold))
+    bounds = compile_feature_bounds(feature_bounds)
+    zone_rows, breach_rows = row_zone_scores(
+        window_df[bounds.features].to_numpy(dtype=float), bounds
+    )
 
-    # -----------------------------
-    # STEP 5 — T² score (Signal A)
-    # -----------------------------
-    T2_score = clip(
-        0.4 * (T2_mean / threshold) +
-        0.6 * (T2_max / threshold)
+    scored, (T2_score, persistence_score, risk_zone_score) = _score_window(
+        T2, threshold, zone_rows, breach_rows, bounds, weights
     )
 
     # -----------------------------
-    # STEP 6 — Persistence score (Signal B)
+    # STEP 12 — Output
     # -----------------------------
-    persistence_score = clip(exceedance_count / 5)
+    print("T2 score:", T2_score)
+    print("Persistence score:", persistence_score)
+    print("Risk zone score:", risk_zone_score)
+    return {
+        "window_start": window_start,
+        "window_end": window_end,
+        **scored
+    }
 
-    # -----------------------------
-    # STEP 7 — Risk zone score (Signal C)
-    # -----------------------------
-    zone_scores = []
-    risk_zone_hits = {}
 
-    for feature, bounds in feature_bounds.items():
-        values = window_df[feature].values
-        mean_score, max_score = compute_risk_zone_score(values, bounds)
-        zone_scores.append(mean_score)
+def _iter_rolling_windows(times, X, window_days):
+    """
+    Walk every distinct window end in sorted `times`, keeping the window
+    moments current with rank-one add/remove updates.
+
+    Only complete rows enter the running moments: a NaN cannot be removed
+    again. While the window holds incomplete rows its moments are
+    computed from the window rows instead (as run_stage1_v2 does).
+
+    Yields (window_start, window_end, lo, hi, moments) where rows
+    lo:hi of X fall inside [window_start, window_end].
+    """
+    span = np.timedelta64(timedelta(days=window_days))
+    complete = ~np.isnan(X).any(axis=1)
+    moments = RollingMoments(X.shape[1])
+    lo = hi = 0
+    incomplete = 0
+
+    for step, end in enumerate(np.unique(times), start=1):
+        start = end - span
+        new_hi = int(np.searchsorted(times, end, side="right"))
+        new_lo = int(np.searchsorted(times, start, side="left"))
+
+        for i in range(hi, new_hi):
+            if complete[i]:
+                moments.add(X[i])
+            else:
+                incomplete += 1
+        for i in range(lo, new_lo):
+            if complete[i]:
+                moments.remove(X[i])
+            else:
+                incomplete -= 1
+        lo, hi = new_lo, new_hi
+
+        if step % ROLLING_REFRESH_EVERY == 0:
+            moments.refresh(X[lo:hi][complete[lo:hi]])
 
-        if max_score == 1.0:
-            risk_zone_hits[feature] = "critical"
-        elif max_score == 0.5:
-            risk_zone_hits[feature] = "caution"
+        if incomplete:
+            window_moments = RollingMoments(X.shape[1])
+            window_moments.refresh(X[lo:hi])
+            yield pd.Timestamp(start), pd.Timestamp(end), lo, hi, window_moments
         else:
-            risk_zone_hits[feature] = "expected"
+            yield pd.Timestamp(start), pd.Timestamp(end), lo, hi, moments
+
+
+def run_stage1_backfill(
+    df,
+    time_column,
+    feature_list,
+    feature_bounds,
+    window_days=14,
+    alpha=0.01,
+    weights=None
+):
+    """
+    CADEN Stage 1 v2 — rolling backfill
+
+    Emits the Stage 1 result for every window end across the full history,
+    using the same window rule as run_stage1_v2 ([end - window_days, end]).
+    Window mean and covariance are updated incrementally rather than
+    recomputed for each window.
+
+    Returns a list of Stage 1 outputs ordered by window_end.
+    """
+
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+
+    df = df.assign(**{time_column: pd.to_datetime(df[time_column])})
+    df = df.sort_values(time_column, kind="stable").reset_index(drop=True)
+
+    times = df[time_column].values
+    X = df[feature_list].to_numpy(dtype=float)
+    threshold = chi2_threshold(alpha, X.shape[1])
+
+    bounds = compile_feature_bounds(feature_bounds)
+    zone_rows, breach_rows = row_zone_scores(
+        df[bounds.features].to_numpy(dtype=float), bounds
+    )
+
+    results = []
+    for window_start, window_end, lo, hi, moments in _iter_rolling_windows(times, X, window_days):
+        if hi - lo < 2:
+            results.append(_insufficient_data_output(window_start, window_end))
+            continue
+
+        T2 = t2_scores(X[lo:hi], moments.mean, moments.cov)
+        scored, _ = _score_window(
+            T2, threshold, zone_rows[lo:hi], breach_rows[lo:hi], bounds, weights
+        )
+
+        results.append({
+            "window_start": window_start,
+            "window_end": window_end,
+            **scored
+        })
+
+    return results
+
+
+def _score_segment_block(X, present, zone_rows, breach_rows, threshold, bounds, weights):
+    """
+    Score a block of segments held as a dense segment x time x feature
+    array. `present` marks which (segment, time) cells hold a state row.
+
+    Moments and T² are computed for the whole block at once; only the
+    final per-segment summary runs segment by segment.
+    """
+    n = present.sum(axis=1)
+    scorable = n >= 2
+    outputs = [None] * len(X)
+
+    if scorable.any():
+        Xs, mask, ns = X[scorable], present[scorable], n[scorable]
+
+        mu = np.where(mask[..., None], Xs, 0.0).sum(axis=1) / ns[:, None]
+        # Missing cells are filled with the segment mean so they add
+        # nothing to the covariance and are ignored when summarizing
+        Xs = np.where(mask[..., None], Xs, mu[:, None, :])
+        centered = Xs - mu[:, None, :]
+        Sigma = np.swapaxes(centered, 1, 2) @ centered / (ns - 1)[:, None, None]
+
+        T2 = t2_scores(Xs, mu, Sigma)
+
+        for j, i in enumerate(np.flatnonzero(scorable)):
+            rows = mask[j]
+            outputs[i], _ = _score_window(
+                T2[j][rows], threshold,
+                zone_rows[i][rows], breach_rows[i][rows],
+                bounds, weights
+            )
+
+    return outputs
+
+
+def _score_segment_block_task(args):
+    return _score_segment_block(*args)
+
+
+def run_stage1_segmented(
+    df,
+    time_column,
+    segment_keys,
+    feature_list,
+    feature_bounds,
+    window_days=14,
+    alpha=0.01,
+    weights=None,
+    n_jobs=1
+):
+    """
+    CADEN Stage 1 v2 — per segment
 
-    risk_zone_score = clip(float(np.mean(zone_scores))) if zone_scores else 0.0
+    Runs Stage 1 for every segment (e.g. supplier_id, inventory_location)
+    of a segmented state_df over the shared analysis window ending at the
+    latest time. The window is pivoted once into a
+    segment x time x feature array and scored in batched blocks;
+    n_jobs > 1 spreads the blocks over a process pool.
 
-    critical_count = sum(1 for v in risk_zone_hits.values() if v == "critical")
+    Returns a list of Stage 1 outputs, each with a "segment" entry
+    holding its key values.
+    """
 
-   
+    if weights is None:
+        weights = DEFAULT_WEIGHTS
+
+    segment_keys = list(segment_keys)
 
     # -----------------------------
-    # STEP 9 — Final risk score
+    # STEP 0 — Select shared window
     # -----------------------------
-    risk_score = clip(
-        weights["t2"] * T2_score +
-        weights["persistence"] * persistence_score +
-        weights["risk_zone"] * risk_zone_score
-    )
-    # Risk override: many critical KPIs
-    risk_override = (risk_zone_score >= 0.6 and critical_count >= 2)
+    times = pd.to_datetime(df[time_column])
+    window_end = times.max()
+    window_start = window_end - timedelta(days=window_days)
+
+    in_window = ((times >= window_start) & (times <= window_end)).to_numpy()
+    window_df = df.loc[in_window]
 
     # -----------------------------
-    # STEP 10 — Anomaly level
+    # STEP 1 — Segment x time x feature array
     # -----------------------------
-    if risk_override:
-        anomaly_level = "strong"
-    elif risk_score < 0.20:
-        anomaly_level = "none"
-    elif risk_score < 0.40:
-        anomaly_level = "marginal"
-    elif risk_score < 0.65:
-        anomaly_level = "moderate"
-    else:
-        anomaly_level = "strong"
+    segments = df[segment_keys].drop_duplicates().sort_values(segment_keys)
+    segment_codes = pd.MultiIndex.from_frame(segments).get_indexer(
+        pd.MultiIndex.from_frame(window_df[segment_keys])
+    )
+
+    window_times = times.to_numpy()[in_window]
+    time_grid = np.unique(window_times)
+    time_codes = np.searchsorted(time_grid, window_times)
+
+    bounds = compile_feature_bounds(feature_bounds)
+    S, T = len(segments), len(time_grid)
+
+    X = np.full((S, T, len(feature_list)), np.nan)
+    X[segment_codes, time_codes] = window_df[feature_list].to_numpy(dtype=float)
+
+    present = np.zeros((S, T), dtype=bool)
+    present[segment_codes, time_codes] = True
+
+    zone_values = np.full((S, T, len(bounds.features)), np.nan)
+    zone_values[segment_codes, time_codes] = window_df[bounds.features].to_numpy(dtype=float)
+    zone_rows, breach_rows = row_zone_scores(zone_values, bounds)
 
     # -----------------------------
-    # STEP 11 — Decision gate
+    # STEP 2 — Score blocks
     # -----------------------------
-    decision_gate = "proceed" if anomaly_level in ["moderate", "strong"] else "stop"
+    threshold = chi2_threshold(alpha, len(feature_list))
+    tasks = [
+        (
+            X[i:i + SEGMENT_BLOCK_SIZE], present[i:i + SEGMENT_BLOCK_SIZE],
+            zone_rows[i:i + SEGMENT_BLOCK_SIZE], breach_rows[i:i + SEGMENT_BLOCK_SIZE],
+            threshold, bounds, weights
+        )
+        for i in range(0, S, SEGMENT_BLOCK_SIZE)
+    ]
+
+    if n_jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            blocks = list(pool.map(_score_segment_block_task, tasks))
+    else:
+        blocks = [_score_segment_block_task(task) for task in tasks]
 
     # -----------------------------
-    # STEP 12 — Output
+    # STEP 3 — Output
     # -----------------------------
-    print("T2 score:", T2_score)
-    print("Persistence score:", persistence_score)
-    print("Risk zone score:", risk_zone_score)
-    return {
-        "window_start": window_start,
-        "window_end": window_end,
+    results = []
+    scored_all = [scored for block in blocks for scored in block]
 
-        "anomaly_level": anomaly_level,
-        "risk_score": round(risk_score, 3),
+    for values, scored in zip(segments.itertuples(index=False), scored_all):
+        if scored is None:
+            scored = _insufficient_data_output(window_start, window_end)
+        else:
+            scored = {"window_start": window_start, "window_end": window_end, **scored}
 
-        "t2_summary": {
-            "mean": round(T2_mean, 3),
-            "max": round(T2_max, 3),
-            "threshold": round(float(threshold), 3),
-            "exceedance_count": exceedance_count
-        },
+        results.append({"segment": dict(zip(segment_keys, values)), **scored})
 
-        "risk_zone_hits": risk_zone_hits,
-        "decision_gate": decision_gate
-    }
+    return results
@@ -1,54 +1,155 @@
 import numpy as np
 
-def run_stage2_v2(state_df, stage1_output, features, baseline_days):
+
+# Day-over-day moves in one direction needed to call a trend consistent
+DIRECTIONAL_CONSISTENCY = 0.65
+
+# Window / baseline variance ratio above which a feature became unstable
+VARIANCE_RATIO_THRESHOLD = 1.5
+
+# Absolute correlation for a pair of notable features to move together
+CORRELATION_THRESHOLD = 0.8
+
+
+def _column_moments(X):
+    """NaN-aware column count, mean and sample variance (ddof=1)."""
+    valid = ~np.isnan(X)
+    n = valid.sum(axis=0)
+    filled = np.where(valid, X, 0.0)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(n > 0, filled.sum(axis=0) / n, np.nan)
+        sq = np.where(valid, (X - mean) ** 2, 0.0).sum(axis=0)
+        var = np.where(n > 1, sq / (n - 1), np.nan)
+
+    return n, mean, var
+
+
+def run_stage2_v2(state_df, stage1_output, features, baseline_days, index=None):
     """
     Stage 2 v2 (Refactored)
-    Extracts directional signals for Bayesian likelihoods
+    Extracts directional signals for Bayesian likelihoods, plus the
+    temporal, directional, variability and relational context used by
+    the v2 narrative.
+
+    Window and baseline statistics come from one pass over the window and
+    baseline matrices, or, when index (a core.window_index.WindowStatsIndex
+    over state_df and features) is given by a caller replaying many
+    windows, from its prefix sums.
     """
 
     window_start = stage1_output["window_start"]
     window_end = stage1_output["window_end"]
 
-    # Analysis window
-    window_df = state_df[
-        (state_df["time"] >= window_start) &
-        (state_df["time"] <= window_end)
-    ]
+    # -----------------------------
+    # Mean shift vs baseline
+    # -----------------------------
+    if index is None:
+        # Analysis window and the baseline_days rows before it
+        window_df = state_df[
+            (state_df["time"] >= window_start) &
+            (state_df["time"] <= window_end)
+        ]
+        baseline_df = state_df[
+            (state_df["time"] < window_start)
+        ].tail(baseline_days)
 
-    # Baseline window
-    baseline_df = state_df[
-        (state_df["time"] < window_start)
-    ].tail(baseline_days)
+        W = window_df[features].to_numpy(dtype=float)
+        B = baseline_df[features].to_numpy(dtype=float)
 
-    signals = {}
+        _, window_mean, window_var = _column_moments(W)
+        _, baseline_mean, baseline_var = _column_moments(B)
+    else:
+        window = index.window(window_start, window_end)
+        baseline = index.before(window_start, baseline_days)
 
-    for feature in features:
-        window_mean = window_df[feature].mean()
-        baseline_mean = baseline_df[feature].mean()
-        baseline_std = baseline_df[feature].std()
+        W = index.rows(*window)
 
-        if baseline_std == 0 or np.isnan(baseline_std):
-            continue
+        window_mean, window_var = index.nanmean(*window), index.nanvar(*window)
+        baseline_mean, baseline_var = index.nanmean(*baseline), index.nanvar(*baseline)
+    baseline_std = np.sqrt(baseline_var)
+
+    usable = ~((baseline_std == 0) | np.isnan(baseline_std))
 
+    with np.errstate(invalid="ignore", divide="ignore"):
         delta = window_mean - baseline_mean
         z = delta / baseline_std
+        variance_ratio = window_var / baseline_var
 
-        # Direction
-        if abs(z) < 0.5:
-            direction = "flat"
-        elif z > 0:
-            direction = "up"
-        else:
-            direction = "down"
+    # Direction and bounded strength
+    direction = np.where(np.abs(z) < 0.5, "flat", np.where(z > 0, "up", "down"))
+    strength = np.minimum(np.abs(z) / 3.0, 1.0)
+
+    # -----------------------------
+    # Day-over-day movement
+    # -----------------------------
+    steps = np.diff(W, axis=0)
+    up_days = (steps > 0).sum(axis=0)
+    down_days = (steps < 0).sum(axis=0)
+    moves = max(len(W) - 1, 1)
 
-        # Strength (bounded)
-        strength = min(abs(z) / 3.0, 1.0)
+    # -----------------------------
+    # Assemble contexts
+    # -----------------------------
+    signals = {}
+    temporal_context = {}
+    directional_context = {}
+    variability_context = {}
+
+    for i, feature in enumerate(features):
+        if not usable[i]:
+            continue
 
         signals[feature] = {
-            "direction": direction,
-            "strength": round(strength, 3)
+            "direction": str(direction[i]),
+            "strength": round(float(strength[i]), 3)
         }
 
+        if direction[i] != "flat":
+            temporal_context[feature] = {
+                "window_mean": round(float(window_mean[i]), 4),
+                "baseline_mean": round(float(baseline_mean[i]), 4),
+                "mean_shift": round(float(delta[i]), 4),
+                "z_score": round(float(z[i]), 3)
+            }
+
+        if max(up_days[i], down_days[i]) / moves >= DIRECTIONAL_CONSISTENCY:
+            directional_context[feature] = {
+                "up_days": int(up_days[i]),
+                "down_days": int(down_days[i])
+            }
+
+        if variance_ratio[i] >= VARIANCE_RATIO_THRESHOLD:
+            variability_context[feature] = {
+                "variance_ratio": round(float(variance_ratio[i]), 3)
+            }
+
+    # -----------------------------
+    # Correlation among notable features
+    # -----------------------------
+    relational_context = {}
+    notable = [
+        i for i, feature in enumerate(features)
+        if feature in temporal_context or feature in variability_context
+    ]
+
+    if len(notable) > 1 and len(W) > 2:
+        if index is None:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                corr = np.corrcoef(W[:, notable], rowvar=False)
+        else:
+            corr = index.correlation(*window, columns=notable)
+
+        rows, cols = np.triu_indices(len(notable), k=1)
+        for r, c in zip(rows, cols):
+            if abs(corr[r, c]) >= CORRELATION_THRESHOLD:
+                pair = f"{features[notable[r]]}__{features[notable[c]]}"
+                relational_context[pair] = round(float(corr[r, c]), 3)
+
     return {
-        "signals": signals
+        "signals": signals,
+        "temporal_context": temporal_context,
+        "directional_context": directional_context,
+        "variability_context": variability_context,
+        "relational_context": relational_context
     }
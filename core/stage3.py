@@ -1,3 +1,9 @@
+import warnings
+from typing import NamedTuple
+
+import numpy as np
+
+
 def compute_likelihood(stage2_output, expectations):
     """
     Generic likelihood computation based on signal match
@@ -60,3 +66,133 @@ def run_stage3_v2(stage2_output, stage1_output, hypotheses_config):
     results.sort(key=lambda x: x["posterior"], reverse=True)
 
     return results
+
+
+# -----------------------------
+# Compiled (batched) scoring
+# -----------------------------
+DIRECTION_CODES = {"down": -1, "flat": 0, "up": 1}
+
+MISMATCH_PENALTY = 0.2
+NO_MATCH_LIKELIHOOD = 0.1
+MIN_LIKELIHOOD = 0.05
+
+
+class CompiledHypotheses(NamedTuple):
+    """
+    hypotheses_config as arrays: one row per hypothesis, one column per
+    expectation feature available in the state.
+    """
+    names: list
+    features: list
+    priors: np.ndarray          # (H,)
+    expected: np.ndarray        # (H, F) direction codes
+    has_expectation: np.ndarray # (H, F) bool
+    missing_features: dict      # hypothesis -> expectation features not in the state
+
+
+def compile_hypotheses(hypotheses_config, available_features):
+    """
+    Compile hypotheses_config once into an expectation matrix and prior
+    vector. Expectation features not in available_features can never
+    produce a signal; they are reported here (and warned about) instead
+    of being skipped on every call.
+    """
+    names = list(hypotheses_config)
+    available = set(available_features)
+
+    features = []
+    missing_features = {}
+    for name, cfg in hypotheses_config.items():
+        for feature, direction in cfg.get("expectations", {}).items():
+            if direction not in DIRECTION_CODES:
+                raise ValueError(
+                    f"Hypothesis '{name}' expects '{direction}' for '{feature}'. "
+                    f"Supported: {list(DIRECTION_CODES)}"
+                )
+            if feature not in available:
+                missing_features.setdefault(name, []).append(feature)
+            elif feature not in features:
+                features.append(feature)
+
+    if missing_features:
+        warnings.warn(
+            f"Hypothesis expectations reference features not in the state: {missing_features}"
+        )
+
+    column = {feature: j for j, feature in enumerate(features)}
+    expected = np.zeros((len(names), len(features)), dtype=np.int8)
+    has_expectation = np.zeros((len(names), len(features)), dtype=bool)
+
+    for i, cfg in enumerate(hypotheses_config.values()):
+        for feature, direction in cfg.get("expectations", {}).items():
+            if feature in column:
+                expected[i, column[feature]] = DIRECTION_CODES[direction]
+                has_expectation[i, column[feature]] = True
+
+    priors = np.array([cfg["prior"] for cfg in hypotheses_config.values()], dtype=float)
+
+    return CompiledHypotheses(names, features, priors, expected, has_expectation, missing_features)
+
+
+def signals_to_arrays(stage2_outputs, features):
+    """
+    Stage 2 signal dicts as (directions, strengths, present) arrays of
+    shape (runs, features).
+    """
+    R, F = len(stage2_outputs), len(features)
+    directions = np.zeros((R, F), dtype=np.int8)
+    strengths = np.zeros((R, F))
+    present = np.zeros((R, F), dtype=bool)
+
+    for r, output in enumerate(stage2_outputs):
+        signals = output.get("signals", {})
+        for j, feature in enumerate(features):
+            observed = signals.get(feature)
+            if observed:
+                directions[r, j] = DIRECTION_CODES[observed["direction"]]
+                strengths[r, j] = observed["strength"]
+                present[r, j] = True
+
+    return directions, strengths, present
+
+
+def score_hypotheses(compiled, directions, strengths, present):
+    """
+    Posterior matrix (runs, hypotheses) for a batch of Stage 2 signals,
+    with the same likelihood rules as compute_likelihood:
+    matched expectation -> x strength, mismatch -> x 0.2,
+    no match -> 0.1, floor 0.05. Products are taken in log space.
+    """
+    active = present[:, None, :] & compiled.has_expectation[None, :, :]
+    match = active & (directions[:, None, :] == compiled.expected[None, :, :])
+    mismatch = active & ~match
+
+    with np.errstate(divide="ignore"):
+        log_strength = np.log(strengths)
+
+    log_score = (
+        np.where(match, log_strength[:, None, :], 0.0).sum(axis=-1) +
+        mismatch.sum(axis=-1) * np.log(MISMATCH_PENALTY)
+    )
+
+    likelihood = np.where(
+        match.any(axis=-1),
+        np.maximum(np.exp(log_score), MIN_LIKELIHOOD),
+        NO_MATCH_LIKELIHOOD
+    )
+
+    posterior = compiled.priors[None, :] * likelihood
+    total = posterior.sum(axis=1, keepdims=True)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, posterior / total, 1.0 / len(compiled.names))
+
+
+def run_stage3_batch(stage2_outputs, compiled):
+    """
+    Stage 3 for many Stage 2 outputs (windows / segments) at once.
+    Returns the posterior matrix, columns in compiled.names order.
+    """
+    directions, strengths, present = signals_to_arrays(stage2_outputs, compiled.features)
+    return score_hypotheses(compiled, directions, strengths, present)
@@ -1,12 +1,13 @@
 import os
-import anthropic
 
 
-def run_stage4_llm(stage1_output, stage2_output=None, stage3_output=None):
+MODEL = "claude-sonnet-4-20250514"
+MAX_TOKENS = 500
+
+
+def build_stage4_prompt(stage1_output, stage2_output, stage3_output):
     """
-    Stage 4: Narrative generation
-    - Informational narrative when no anomaly
-    - LLM narrative only when explanation exists
+    Executive-summary prompt for an anomaly that passed the decision gate.
     """
     top = stage3_output[0]
 
@@ -23,30 +24,7 @@ def run_stage4_llm(stage1_output, stage2_output=None, stage3_output=None):
         if v["strength"] > 0.3
     )
 
-    # -----------------------------
-    # CASE 1: No or marginal anomaly
-    # -----------------------------
-    if stage1_output.get("decision_gate") == "stop":
-        reason = stage1_output.get("reason", "No significant anomaly detected")
-
-        return (
-            "System Status Update:\n\n"
-            "No significant anomalies were detected during the current monitoring window.\n"
-            f"Reason: {reason}.\n"
-            "The system remains within expected operational behavior. No action is required."
-        )
-
-    # -----------------------------
-    # CASE 2: Anomaly present
-    # -----------------------------
-    hypothesis_name = "Unknown"
-    confidence = "N/A"
-
-    if stage3_output and len(stage3_output) > 0:
-        hypothesis_name = stage3_output[0].get("hypothesis", "Unknown")
-        confidence = round(stage3_output[0].get("posterior", 0.0), 2)
-
-    prompt = f"""
+    return f"""
     Anomaly detected: {metric_summary} deviated during {date}.
     Severity level: {stage1_output['anomaly_level']} ({magnitude}% risk score).
 
@@ -62,29 +40,101 @@ def run_stage4_llm(stage1_output, stage2_output=None, stage3_output=None):
     """
 
 
-    try:
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
-            raise RuntimeError("Anthropic API key not found")
+def stop_narrative(stage1_output):
+    """Informational narrative when the decision gate stops the pipeline."""
+    reason = stage1_output.get("reason", "No significant anomaly detected")
+
+    return (
+        "System Status Update:\n\n"
+        "No significant anomalies were detected during the current monitoring window.\n"
+        f"Reason: {reason}.\n"
+        "The system remains within expected operational behavior. No action is required."
+    )
+
 
-        client = anthropic.Anthropic(api_key=api_key)
+def fallback_narrative(stage3_output):
+    """Structured text used when no LLM narrative can be generated."""
+    hypothesis_name = "Unknown"
+
+    if stage3_output and len(stage3_output) > 0:
+        hypothesis_name = stage3_output[0].get("hypothesis", "Unknown")
+
+    return (
+        "An anomaly was detected, but an automated narrative could not be generated.\n"
+        f"Top hypothesis: {hypothesis_name}\n"
+        "Please refer to structured analysis and KPIs."
+    )
+
+
+def make_client():
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise RuntimeError("Anthropic API key not found")
+
+    # Imported here so runs that stop at the gate never load the SDK
+    import anthropic
+
+    return anthropic.Anthropic(api_key=api_key)
+
+
+def run_stage4_llm(
+    stage1_output,
+    stage2_output=None,
+    stage3_output=None,
+    client=None,
+    cache=None,
+    model=MODEL,
+    max_tokens=MAX_TOKENS
+):
+    """
+    Stage 4: Narrative generation
+    - Informational narrative when no anomaly
+    - LLM narrative only when explanation exists
+
+    client: optional object exposing messages.create (e.g. a fake for tests);
+            an Anthropic client is created when omitted
+    cache:  optional NarrativeCache; identical prompts are served from it
+    """
+
+    # -----------------------------
+    # CASE 1: No or marginal anomaly
+    # -----------------------------
+    if stage1_output.get("decision_gate") == "stop":
+        return stop_narrative(stage1_output)
+
+    # -----------------------------
+    # CASE 2: Anomaly present
+    # -----------------------------
+    prompt = build_stage4_prompt(stage1_output, stage2_output, stage3_output)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(model, prompt, max_tokens)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        if client is None:
+            client = make_client()
 
         response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=500,
+            model=model,
+            max_tokens=max_tokens,
             messages=[
                 {"role": "user", "content": prompt}
             ]
         )
 
-        return response.content[0].text.strip()
+        narrative = response.content[0].text.strip()
+
+        if cache is not None:
+            cache.put(cache_key, narrative)
+
+        return narrative
 
     except Exception as e:
         print("\n[Stage 4 LLM Exception]")
         print(type(e).__name__, ":", str(e))
 
-        return (
-            "An anomaly was detected, but an automated narrative could not be generated.\n"
-            f"Top hypothesis: {hypothesis_name}\n"
-            "Please refer to structured analysis and KPIs."
-        )
+        return fallback_narrative(stage3_output)
@@ -0,0 +1,150 @@
+import asyncio
+import os
+
+from core.stage4 import (
+    MAX_TOKENS,
+    MODEL,
+    build_stage4_prompt,
+    fallback_narrative,
+    stop_narrative,
+)
+
+
+def make_async_client(concurrency=8):
+    """
+    One pooled async client for a whole batch; the connection pool is
+    sized to the concurrency limit. Retries are handled by the caller.
+    """
+    import anthropic
+    import httpx
+
+    api_key = os.getenv("ANTHROPIC_API_KEY")
+    if not api_key:
+        raise RuntimeError("Anthropic API key not found")
+
+    return anthropic.AsyncAnthropic(
+        api_key=api_key,
+        max_retries=0,
+        http_client=anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=concurrency,
+                max_keepalive_connections=concurrency
+            )
+        )
+    )
+
+
+async def _generate_one(
+    client,
+    semaphore,
+    stage1_output,
+    stage2_output,
+    stage3_output,
+    cache,
+    model,
+    max_tokens,
+    timeout,
+    retries,
+    backoff
+):
+    if stage1_output.get("decision_gate") == "stop":
+        return stop_narrative(stage1_output)
+
+    prompt = build_stage4_prompt(stage1_output, stage2_output, stage3_output)
+
+    cache_key = None
+    if cache is not None:
+        cache_key = cache.make_key(model, prompt, max_tokens)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    error = None
+    for attempt in range(retries + 1):
+        # Hold a concurrency slot only while a request is in flight
+        async with semaphore:
+            try:
+                response = await asyncio.wait_for(
+                    client.messages.create(
+                        model=model,
+                        max_tokens=max_tokens,
+                        messages=[
+                            {"role": "user", "content": prompt}
+                        ]
+                    ),
+                    timeout=timeout
+                )
+                narrative = response.content[0].text.strip()
+
+                if cache is not None:
+                    cache.put(cache_key, narrative)
+
+                return narrative
+
+            except Exception as e:
+                error = e
+
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt)
+
+    print("\n[Stage 4 LLM Exception]")
+    print(type(error).__name__, ":", str(error))
+
+    return fallback_narrative(stage3_output)
+
+
+async def run_stage4_batch_async(
+    runs,
+    client=None,
+    cache=None,
+    concurrency=8,
+    timeout=30.0,
+    retries=2,
+    backoff=0.5,
+    model=MODEL,
+    max_tokens=MAX_TOKENS
+):
+    """
+    Stage 4 for many Stage 1–3 results concurrently.
+
+    runs:        sequence of (stage1_output, stage2_output, stage3_output)
+    client:      object exposing an async messages.create (e.g. a fake for
+                 tests); a pooled AsyncAnthropic client is created when omitted
+    cache:       optional NarrativeCache
+    concurrency: maximum requests in flight
+    timeout:     seconds per call; timed-out calls are retried
+    retries:     extra attempts per narrative, with exponential backoff
+
+    Returns narratives in the order of `runs`; failed calls get the
+    structured fallback text.
+    """
+    owns_client = client is None
+    if owns_client:
+        try:
+            client = make_async_client(concurrency)
+        except Exception as e:
+            print("\n[Stage 4 LLM Exception]")
+            print(type(e).__name__, ":", str(e))
+            return [
+                stop_narrative(s1) if s1.get("decision_gate") == "stop" else fallback_narrative(s3)
+                for s1, _, s3 in runs
+            ]
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    try:
+        return await asyncio.gather(*[
+            _generate_one(
+                client, semaphore, stage1_output, stage2_output, stage3_output,
+                cache, model, max_tokens, timeout, retries, backoff
+            )
+            for stage1_output, stage2_output, stage3_output in runs
+        ])
+    finally:
+        if owns_client:
+            await client.close()
+
+
+def run_stage4_batch(runs, **kwargs):
+    """Blocking wrapper around run_stage4_batch_async."""
+    return asyncio.run(run_stage4_batch_async(runs, **kwargs))
@@ -56,8 +56,9 @@ def run_stage4_v2(
 
         for pair, corr in stage2_output.get("relational_context", {}).items():
             f1, f2 = pair.split("__")
+            movement = "moved together" if corr > 0 else "moved in opposite directions"
             observations.append(
-                f"{f1.replace('_', ' ').title()} and {f2.replace('_', ' ').title()} moved together during this period."
+                f"{f1.replace('_', ' ').title()} and {f2.replace('_', ' ').title()} {movement} during this period."
             )
 
     if not observations:
@@ -71,13 +72,13 @@ def run_stage4_v2(
     if stage3_output:
         top = stage3_output[0]
         explanations.append(
-            f"The most likely explanation is '{top['description']}'."
+            f"The most likely explanation is '{top.get('description', top['hypothesis'])}'."
         )
 
-        if len(stage3_output) > 1 and stage3_output[1]["confidence"] > 0.2:
+        if len(stage3_output) > 1 and stage3_output[1].get("confidence", stage3_output[1]["posterior"]) > 0.2:
             second = stage3_output[1]
             explanations.append(
-                f"A secondary contributing factor may be '{second['description']}'."
+                f"A secondary contributing factor may be '{second.get('description', second['hypothesis'])}'."
             )
     else:
         explanations.append(
@@ -1,16 +1,71 @@
 import numpy as np
 
+
+def _entropy_bits(P):
+    """Shannon entropy (bits) of each row of P; zero entries contribute 0."""
+    P = np.asarray(P, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = np.where(P > 0, P * np.log2(P), 0.0)
+    return -terms.sum(axis=-1)
+
+
+def compute_nci_batch(posteriors):
+    """NCI per run: top posterior of each row of a (runs, hypotheses) matrix."""
+    return np.asarray(posteriors, dtype=float).max(axis=-1)
+
+
+def compute_der_batch(priors, posteriors):
+    """
+    DER per run: entropy of the prior minus entropy of the posterior.
+    priors: (hypotheses,) shared prior vector or (runs, hypotheses)
+    """
+    return _entropy_bits(priors) - _entropy_bits(posteriors)
+
+
+def compute_cds_batch(influences):
+    """
+    CDS per run: 1 - normalized entropy of each row of causal influences.
+    Rows with no influence mass score 0.
+    """
+    influences = np.asarray(influences, dtype=float)
+    total = influences.sum(axis=-1, keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = np.where(total > 0, influences / total, 0.0)
+
+    max_entropy = np.log2(influences.shape[-1]) if influences.shape[-1] else 0.0
+    if max_entropy <= 0:
+        return np.zeros(influences.shape[:-1])
+
+    return np.where(total[..., 0] > 0, 1 - _entropy_bits(normalized) / max_entropy, 0.0)
+
+
+def compute_decision_metrics_batch(priors, posteriors):
+    """
+    NCI, DER and CDS arrays for a (runs, hypotheses) posterior matrix and
+    its prior vector; the posteriors double as causal influences.
+    """
+    return {
+        "nci": compute_nci_batch(posteriors),
+        "der": compute_der_batch(priors, posteriors),
+        "cds": compute_cds_batch(posteriors),
+    }
+
+
 def compute_nci(posteriors):
-    return max([p["posterior"] for p in posteriors])
+    return float(compute_nci_batch([p["posterior"] for p in posteriors]))
 
 def compute_der(prior_action_probs, post_action_probs):
-    H_before = -sum([p * np.log2(p) for p in prior_action_probs if p > 0])
-    H_after = -sum([p * np.log2(p) for p in post_action_probs if p > 0])
-    return H_before - H_after
+    return float(compute_der_batch(prior_action_probs, post_action_probs))
 
 def compute_cds(causal_influences):
-    total = sum(causal_influences.values())
-    normalized = [v / total for v in causal_influences.values()]
-    entropy = -sum([p * np.log2(p) for p in normalized if p > 0])
-    max_entropy = np.log2(len(causal_influences))
-    return 1 - (entropy / max_entropy) if max_entropy > 0 else 0
+    return float(compute_cds_batch(list(causal_influences.values())))
+
+
+def compute_decision_metrics(stage3_output):
+    """NCI, DER and CDS for a single ranked Stage 3 output."""
+    metrics = compute_decision_metrics_batch(
+        [h["prior"] for h in stage3_output],
+        [[h["posterior"] for h in stage3_output]]
+    )
+    return {name: float(values[0]) for name, values in metrics.items()}
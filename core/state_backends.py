@@ -0,0 +1,130 @@
+import importlib.util
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+# Engines tried, in order, by backend="auto"
+AUTO_ORDER = ["polars", "pyarrow"]
+
+# Group-by aggregation names per engine
+POLARS_AGGREGATIONS = {
+    "sum": lambda col: col.sum(),
+    "mean": lambda col: col.mean(),
+    "max": lambda col: col.max(),
+    "min": lambda col: col.min(),
+    "count": lambda col: col.count().cast(int),
+    "nunique": lambda col: col.drop_nulls().n_unique().cast(int),
+}
+
+PYARROW_AGGREGATIONS = {
+    "sum": "sum",
+    "mean": "mean",
+    "max": "max",
+    "min": "min",
+    "count": "count",
+    "nunique": "count_distinct",
+}
+
+
+# -----------------------------
+# Backends
+# -----------------------------
+def aggregate_pandas(df, group_keys, aggregation_config):
+    return (
+        df
+        .groupby(group_keys, as_index=False, observed=True)
+        .agg(dict(aggregation_config))
+    )
+
+
+def _complete_keys(df, group_keys):
+    # pandas drops groups with a missing key; the columnar engines keep them
+    return df[df[group_keys].notna().all(axis=1)]
+
+
+def _restore_dtypes(out, df, group_keys, aggregation_config):
+    """Result columns in pandas' order and dtypes (group keys keep theirs)."""
+    expected = aggregate_pandas(df.iloc[:0], group_keys, aggregation_config).dtypes
+    return pd.DataFrame({
+        column: (
+            pd.Series(out[column], dtype=df[column].dtype)
+            if column in group_keys else
+            pd.Series(out[column]).astype(expected[column])
+        )
+        for column in expected.index
+    })
+
+
+def aggregate_polars(df, group_keys, aggregation_config):
+    """Multi-threaded group-by on Polars (optional dependency)."""
+    import polars as pl
+
+    df = _complete_keys(df, group_keys)
+    frame = pl.DataFrame({
+        column: df[column].to_numpy()
+        for column in dict.fromkeys(group_keys + list(aggregation_config))
+    }, nan_to_null=True)
+
+    out = frame.group_by(group_keys).agg([
+        POLARS_AGGREGATIONS[agg](pl.col(feature)).alias(feature)
+        for feature, agg in aggregation_config.items()
+    ])
+    return _restore_dtypes(
+        {column: out[column].to_numpy() for column in out.columns},
+        df, group_keys, aggregation_config
+    )
+
+
+def aggregate_pyarrow(df, group_keys, aggregation_config):
+    """Multi-threaded group-by on PyArrow compute (optional dependency)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    df = _complete_keys(df, group_keys)
+    table = pa.table({
+        column: pa.array(df[column].to_numpy(), from_pandas=True)
+        for column in dict.fromkeys(group_keys + list(aggregation_config))
+    })
+
+    # Sum of an all-missing group is 0, as in pandas
+    options = {"sum": pc.ScalarAggregateOptions(min_count=0)}
+    out = table.group_by(group_keys, use_threads=True).aggregate([
+        (feature, PYARROW_AGGREGATIONS[agg], options.get(agg))
+        for feature, agg in aggregation_config.items()
+    ])
+
+    columns = {column: out[column].to_numpy(zero_copy_only=False) for column in group_keys}
+    for feature, agg in aggregation_config.items():
+        values = out[f"{feature}_{PYARROW_AGGREGATIONS[agg]}"]
+        columns[feature] = values.to_numpy(zero_copy_only=False) if values.null_count == 0 else (
+            values.cast(pa.float64()).fill_null(np.nan).to_numpy()
+        )
+    return _restore_dtypes(columns, df, group_keys, aggregation_config)
+
+
+BACKENDS = {
+    "pandas": aggregate_pandas,
+    "polars": aggregate_polars,
+    "pyarrow": aggregate_pyarrow,
+}
+
+
+def resolve_backend(name="pandas"):
+    """
+    Backend name to use: "auto" picks the first installed engine in
+    AUTO_ORDER; a requested engine that is not installed falls back to
+    pandas with a warning.
+    """
+    if name not in BACKENDS and name != "auto":
+        raise ValueError(f"State backend must be one of {list(BACKENDS) + ['auto']}, got '{name}'")
+
+    if name == "auto":
+        return next((engine for engine in AUTO_ORDER if importlib.util.find_spec(engine)), "pandas")
+
+    if name != "pandas" and importlib.util.find_spec(name) is None:
+        warnings.warn(f"State backend '{name}' is not installed; using pandas")
+        return "pandas"
+
+    return name
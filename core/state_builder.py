@@ -1,5 +1,9 @@
+import numpy as np
 import pandas as pd
 
+from core.state_backends import BACKENDS, resolve_backend
+from core.time_buckets import bucket_times
+
 
 SUPPORTED_AGGREGATIONS = {
     "sum": "sum",
@@ -11,12 +15,44 @@ SUPPORTED_AGGREGATIONS = {
 }
 
 
+def _validate_inputs(columns, date_column, aggregation_config, segment_keys):
+    if date_column not in columns:
+        raise ValueError(f"Date column '{date_column}' not found in dataframe")
+
+    for key in segment_keys:
+        if key not in columns:
+            raise ValueError(f"Segment key '{key}' not found in dataframe")
+
+    for feature, agg in aggregation_config.items():
+        if feature not in columns:
+            raise ValueError(f"Feature '{feature}' not found in dataframe")
+        if agg not in SUPPORTED_AGGREGATIONS:
+            raise ValueError(
+                f"Aggregation '{agg}' not supported. "
+                f"Supported: {list(SUPPORTED_AGGREGATIONS.keys())}"
+            )
+
+
+def _parse_dates(values: pd.Series, date_format: str | None) -> pd.Series:
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Parse each distinct value once (e.g. dates from core.raw_store)
+        parsed = pd.DatetimeIndex(_parse_dates(pd.Series(values.cat.categories), date_format))
+        return pd.Series(parsed.take(values.cat.codes.to_numpy(), allow_fill=True, fill_value=pd.NaT), index=values.index)
+    if date_format:
+        return pd.to_datetime(values, format=date_format)
+    return pd.to_datetime(values)
+
+
 def build_system_state(
     df_raw: pd.DataFrame,
     date_column: str,
     time_unit: str,
     aggregation_config: dict,
-    date_format: str | None = None) -> pd.DataFrame:
+    date_format: str | None = None,
+    segment_keys: list | None = None,
+    week_start: str = "monday",
+    timezone: str | None = None,
+    backend: str = "pandas") -> pd.DataFrame:
     """
     Build time-indexed system state from raw event data.
 
@@ -27,54 +63,50 @@ def build_system_state(
     date_column : str
         Column representing business time
     time_unit : str
-        One of ['day', 'week', 'hour']
+        One of core.time_buckets.TIME_UNITS
+        (minute, 5min, 15min, hour, day, week, month)
     aggregation_config : dict
         Mapping of feature -> aggregation function
     date_format : str, optional
         Explicit datetime format if needed
+    segment_keys : list, optional
+        Entity columns (e.g. supplier_id, inventory_location) to keep as
+        separate series instead of collapsing into one global state
+    week_start : str
+        First day of "week" buckets (default monday, ISO weeks)
+    timezone : str, optional
+        Timezone whose wall clock defines bucket boundaries
+    backend : str
+        Group-by engine for the aggregation: pandas, polars, pyarrow or
+        auto (first installed columnar engine, else pandas). See
+        core.state_backends.
 
     Returns
     -------
     pd.DataFrame
-        Aggregated system state (one row per time unit)
+        Aggregated system state (one row per time unit, or per time unit
+        and segment when segment_keys is given)
     """
 
-    df = df_raw.copy()
-
     # -----------------------------
     # STEP 0 — Validate inputs
     # -----------------------------
-    if date_column not in df.columns:
-        raise ValueError(f"Date column '{date_column}' not found in dataframe")
+    segment_keys = list(segment_keys or [])
+    _validate_inputs(df_raw.columns, date_column, aggregation_config, segment_keys)
+    aggregate = BACKENDS[resolve_backend(backend)]
 
-    for feature, agg in aggregation_config.items():
-        if feature not in df.columns:
-            raise ValueError(f"Feature '{feature}' not found in dataframe")
-        if agg not in SUPPORTED_AGGREGATIONS:
-            raise ValueError(
-                f"Aggregation '{agg}' not supported. "
-                f"Supported: {list(SUPPORTED_AGGREGATIONS.keys())}"
-            )
+    # Work on the needed columns only (copy-on-write, df_raw is untouched)
+    df = df_raw[list(dict.fromkeys([date_column] + segment_keys + list(aggregation_config)))]
 
     # -----------------------------
     # STEP 1 — Parse datetime
     # -----------------------------
-    if date_format:
-        df[date_column] = pd.to_datetime(df[date_column], format=date_format)
-    else:
-        df[date_column] = pd.to_datetime(df[date_column])
+    df[date_column] = _parse_dates(df[date_column], date_format)
 
     # -----------------------------
     # STEP 2 — Create time key
     # -----------------------------
-    if time_unit == "day":
-        df["time_key"] = df[date_column].dt.floor("D")
-    elif time_unit == "week":
-        df["time_key"] = df[date_column].dt.to_period("W").apply(lambda r: r.start_time)
-    elif time_unit == "hour":
-        df["time_key"] = df[date_column].dt.floor("H")
-    else:
-        raise ValueError("time_unit must be one of ['day', 'week', 'hour']")
+    df["time_key"] = bucket_times(df[date_column], time_unit, week_start, timezone)
 
     # -----------------------------
     # STEP 3 — Build aggregation dict
@@ -88,12 +120,233 @@ def build_system_state(
     # STEP 4 — Aggregate
     # -----------------------------
     state_df = (
-        df
-        .groupby("time_key", as_index=False)
-        .agg(agg_dict)
+        aggregate(df, ["time_key"] + segment_keys, agg_dict)
         .rename(columns={"time_key": "time"})
-        .sort_values("time")
+        .sort_values(segment_keys + ["time"])
         .reset_index(drop=True)
     )
 
     return state_df
+
+
+# Partial aggregates kept per time key; each is mergeable across chunks
+PARTIAL_AGGREGATES = {
+    "sum": ["sum"],
+    "mean": ["sum", "count"],
+    "max": ["max"],
+    "min": ["min"],
+    "count": ["count"],
+    "nunique": [],
+}
+
+MERGE_PARTIALS = {
+    "sum": np.add,
+    "count": np.add,
+    "min": np.fmin,
+    "max": np.fmax,
+}
+
+# New time keys collect in a small side frame that is folded into the main
+# partials once it outgrows this share of them (and COMPACT_MIN_KEYS), so an
+# update costs about the size of its batch, not the number of keys seen
+COMPACT_SHARE = 0.125
+COMPACT_MIN_KEYS = 4096
+
+
+class StateAccumulator:
+    """
+    Incrementally built system state.
+
+    Raw rows are folded in batch by batch as mergeable partial aggregates
+    per time key (sum, count, min, max; mean as sum / count). Memory is
+    bounded by the number of time keys, not the number of raw rows.
+    Keys already seen are merged in place and looked up through the
+    partials' index, so update() and finalize(keys) cost about the size
+    of the batch or keys rather than the keys seen so far.
+    finalize() produces the same state_df as build_system_state over all
+    rows seen so far.
+    """
+
+    def __init__(
+        self,
+        date_column: str,
+        time_unit: str,
+        aggregation_config: dict,
+        date_format: str | None = None,
+        segment_keys: list | None = None,
+        week_start: str = "monday",
+        timezone: str | None = None):
+
+        self.date_column = date_column
+        self.time_unit = time_unit
+        self.week_start = week_start
+        self.timezone = timezone
+        self.aggregation_config = aggregation_config
+        self.date_format = date_format
+        self.segment_keys = list(segment_keys or [])
+        self.group_keys = ["time_key"] + self.segment_keys
+
+        self.partial_spec = {
+            f"{feature}:{part}": (feature, part)
+            for feature, agg in aggregation_config.items()
+            for part in PARTIAL_AGGREGATES[agg]
+        }
+        self.distinct_features = [
+            feature for feature, agg in aggregation_config.items() if agg == "nunique"
+        ]
+
+        self._partials = None
+        self._recent = None
+        self._distinct = {feature: None for feature in self.distinct_features}
+
+    @property
+    def columns(self) -> list:
+        """Raw columns needed to build the state."""
+        return list(dict.fromkeys(
+            [self.date_column] + self.segment_keys + list(self.aggregation_config)
+        ))
+
+    def validate(self, columns):
+        _validate_inputs(columns, self.date_column, self.aggregation_config, self.segment_keys)
+
+    def update(self, chunk: pd.DataFrame):
+        """Fold a batch of raw rows into the partial aggregates."""
+        self.validate(chunk.columns)
+
+        dates = _parse_dates(chunk[self.date_column], self.date_format)
+        frame = chunk[self.columns].assign(
+            time_key=bucket_times(dates, self.time_unit, self.week_start, self.timezone)
+        )
+
+        if self.partial_spec:
+            part = (
+                frame
+                .groupby(self.group_keys, observed=True, sort=False)
+                .agg(**self.partial_spec)
+            )
+            self._merge(part)
+        else:
+            part = frame[self.group_keys].drop_duplicates().set_index(self.group_keys)
+            self._merge(part)
+
+        for feature in self.distinct_features:
+            pairs = frame[self.group_keys + [feature]].dropna(subset=[feature]).drop_duplicates()
+            if self._distinct[feature] is not None:
+                pairs = pd.concat([self._distinct[feature], pairs]).drop_duplicates()
+            self._distinct[feature] = pairs
+
+        return part.index
+
+    def _merge(self, part: pd.DataFrame):
+        if self._partials is None:
+            self._partials, self._recent = part, part.iloc[:0]
+            return
+
+        # Keys already held are merged in place, by position
+        for name in ("_partials", "_recent"):
+            frame = getattr(self, name)
+            positions = frame.index.get_indexer(part.index)
+            existing = positions >= 0
+
+            if existing.any():
+                self._merge_rows(frame, positions[existing], part[existing])
+                part = part[~existing]
+            if part.empty:
+                return
+
+        recent = pd.concat([self._recent, part])
+        if len(recent) > max(COMPACT_MIN_KEYS, COMPACT_SHARE * len(self._partials)):
+            self._partials, recent = pd.concat([self._partials, recent]), recent.iloc[:0]
+        self._recent = recent
+
+    @staticmethod
+    def _merge_rows(frame: pd.DataFrame, positions, new: pd.DataFrame):
+        for i, col in enumerate(frame.columns):
+            old = frame[col].to_numpy()[positions]
+            merged = MERGE_PARTIALS[col.rsplit(":", 1)[1]](old, new[col].to_numpy())
+            if merged.dtype != frame[col].dtype:
+                frame[col] = frame[col].astype(merged.dtype)
+            frame.iloc[positions, i] = merged
+
+    def finalize(self, keys=None) -> pd.DataFrame:
+        """
+        Combine the partial aggregates into state_df.
+        keys optionally restricts the output to those group keys.
+        """
+        if self._partials is None:
+            return pd.DataFrame(columns=["time"] + self.segment_keys + list(self.aggregation_config))
+
+        frames = [self._partials] + ([self._recent] if len(self._recent) else [])
+        if keys is not None:
+            frames = [
+                frame.iloc[positions[positions >= 0]]
+                for frame in frames
+                for positions in [frame.index.get_indexer(keys)]
+            ]
+        partials = pd.concat(frames) if len(frames) > 1 else frames[0]
+        state = pd.DataFrame(index=partials.index)
+
+        for feature, agg in self.aggregation_config.items():
+            if agg == "mean":
+                total = partials[f"{feature}:sum"].astype(float)
+                count = partials[f"{feature}:count"]
+                state[feature] = total.where(count > 0) / count.where(count > 0)
+            elif agg == "nunique":
+                distinct = self._distinct[feature]
+                state[feature] = (
+                    distinct.groupby(self.group_keys, observed=True)[feature].size()
+                    .reindex(partials.index, fill_value=0)
+                    if distinct is not None else 0
+                )
+            else:
+                state[feature] = partials[f"{feature}:{agg}"]
+
+        return (
+            state
+            .reset_index()
+            .rename(columns={"time_key": "time"})
+            .sort_values(self.segment_keys + ["time"])
+            .reset_index(drop=True)
+        )
+
+
+def build_system_state_chunked(
+    path: str,
+    date_column: str,
+    time_unit: str,
+    aggregation_config: dict,
+    date_format: str | None = None,
+    segment_keys: list | None = None,
+    week_start: str = "monday",
+    timezone: str | None = None,
+    chunksize: int = 1_000_000) -> pd.DataFrame:
+    """
+    Build system state from a raw CSV too large to load at once.
+
+    Reads the file in chunks with column projection (date column, segment
+    keys and aggregated features only) and folds each chunk into a
+    StateAccumulator, so memory stays bounded by chunksize and the number
+    of time keys.
+
+    Parameters
+    ----------
+    path : str
+        Raw CSV file
+    chunksize : int
+        Rows per chunk
+
+    Other parameters and the result match build_system_state.
+    """
+
+    accumulator = StateAccumulator(
+        date_column, time_unit, aggregation_config, date_format, segment_keys,
+        week_start, timezone
+    )
+
+    # Validate against the header before reading any data
+    accumulator.validate(pd.read_csv(path, nrows=0).columns)
+
+    for chunk in pd.read_csv(path, usecols=accumulator.columns, chunksize=chunksize):
+        accumulator.update(chunk)
+
+    return accumulator.finalize()
@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+# state_builder settings that change the built state; "source" is how the
+# raw file is read (columnar store, chunked CSV or CSV with an ingest dtype
+# plan), which decides the state's dtypes
+STATE_CONFIG_KEYS = [
+    "date_column", "time_unit", "date_format", "aggregations", "segment_keys",
+    "week_start", "timezone", "source",
+]
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def _file_identity(path, hash_content=False):
+    """Identity of the raw file: path, size and mtime, or a content hash."""
+    path = Path(path).resolve()
+    stat = path.stat()
+
+    if not hash_content:
+        return {"path": str(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+
+    return {"size": stat.st_size, "sha256": digest.hexdigest()}
+
+
+def state_cache_key(raw_path, state_config, hash_content=False):
+    """
+    Cache key for a built state: raw file identity plus a hash of the
+    state_builder settings that affect the result.
+    """
+    payload = {
+        "raw": _file_identity(raw_path, hash_content),
+        "state_builder": {key: state_config.get(key) for key in STATE_CONFIG_KEYS},
+    }
+    blob = json.dumps(payload, sort_keys=True, default=str).encode()
+    return hashlib.sha256(blob).hexdigest()
+
+
+class StateCache:
+    """
+    Content-addressed on-disk cache of built state_df frames.
+
+    Each entry is stored column by column in an uncompressed .npz file
+    (datetime and numeric columns as native arrays, everything else as
+    strings), so a hit is a handful of array reads. Entries are evicted
+    least recently used first once the cache exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir=".caden_cache/state", max_bytes=512 * 1024 ** 2, hash_content=False):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hash_content = hash_content
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key):
+        path = self._entry_path(key)
+        if not path.exists():
+            self.misses += 1
+            return None
+
+        with np.load(path, allow_pickle=False) as data:
+            columns = [str(c) for c in data["__columns__"]]
+            state_df = pd.DataFrame({col: data[f"col_{i}"] for i, col in enumerate(columns)})
+
+        # Mark as recently used for eviction
+        os.utime(path)
+        self.hits += 1
+        return state_df
+
+    def put(self, key, state_df):
+        arrays = {"__columns__": np.array(state_df.columns, dtype=str)}
+
+        for i, col in enumerate(state_df.columns):
+            values = state_df[col]
+            if values.dtype.kind in "biufcmM":
+                arrays[f"col_{i}"] = values.to_numpy()
+            else:
+                arrays[f"col_{i}"] = values.to_numpy(dtype=str)
+
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+        self._evict(keep=path)
+
+    def _evict(self, keep=None):
+        entries = sorted(self.cache_dir.glob("*.npz"), key=lambda p: p.stat().st_mtime)
+        total = sum(p.stat().st_size for p in entries)
+
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            total -= path.stat().st_size
+            path.unlink()
+            self.evictions += 1
+
+    def get_or_build(self, raw_path, state_config, build):
+        """
+        Return the cached state for raw_path + state_config, or call
+        build() and store its result.
+        """
+        key = state_cache_key(raw_path, state_config, self.hash_content)
+
+        state_df = self.get(key)
+        if state_df is None:
+            state_df = build()
+            self.put(key, state_df)
+
+        return state_df
+
+    def stats(self):
+        entries = list(self.cache_dir.glob("*.npz"))
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(entries),
+            "size_bytes": sum(p.stat().st_size for p in entries),
+        }
@@ -0,0 +1,180 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from core.hotelling import t2_scores
+from core.risk_zones import compile_feature_bounds, row_zone_scores, summarize_zones
+from core.stage1 import DEFAULT_WEIGHTS, _iter_rolling_windows
+from core.thresholds import chi2_threshold
+
+
+LEVELS = ["none", "marginal", "moderate", "strong"]
+
+# Upper bound on (windows x alphas x weight sets) cells evaluated at once
+SWEEP_BLOCK_CELLS = 1 << 22
+
+
+def expand_weight_grid(values_by_key, base=None):
+    """
+    Cartesian product of risk weight values, e.g.
+    {"t2": [0.25, 0.35], "persistence": [0.25]} -> 2 weight dicts.
+    Keys not given keep their base (default Stage 1) weight.
+    """
+    base = {**DEFAULT_WEIGHTS, **(base or {})}
+    keys = list(values_by_key)
+    return [
+        {**base, **dict(zip(keys, combo))}
+        for combo in itertools.product(*(values_by_key[k] for k in keys))
+    ]
+
+
+# -----------------------------
+# Per-window signals
+# -----------------------------
+def window_signals(state_df, features, feature_bounds, window_days):
+    """
+    Everything Stage 1 needs per window that does not depend on alpha or
+    the risk weights: every row's T², the risk zone score and the critical
+    override flag. One rolling pass, as in run_stage1_backfill.
+
+    Returns a dict of arrays over windows; T² rows are zero-padded to the
+    longest window (T² >= 0, so padding never changes a max or an
+    exceedance count).
+    """
+    df = state_df.assign(time=pd.to_datetime(state_df["time"]))
+    df = df.sort_values("time", kind="stable").reset_index(drop=True)
+
+    times = df["time"].values
+    X = df[features].to_numpy(dtype=float)
+
+    bounds = compile_feature_bounds(feature_bounds)
+    zone_rows, breach_rows = row_zone_scores(df[bounds.features].to_numpy(dtype=float), bounds)
+
+    ends, spans, T2_rows = [], [], []
+    risk_zone, override = [], []
+    for _, window_end, lo, hi, moments in _iter_rolling_windows(times, X, window_days):
+        ends.append(window_end)
+        spans.append(hi - lo)
+        if hi - lo < 2:
+            T2_rows.append(np.empty(0))
+            risk_zone.append(0.0)
+            override.append(False)
+            continue
+
+        T2_rows.append(t2_scores(X[lo:hi], moments.mean, moments.cov))
+
+        mean_scores, max_scores, _ = summarize_zones(zone_rows[lo:hi], breach_rows[lo:hi])
+        zone_score = float(np.clip(np.nan_to_num(np.mean(mean_scores)), 0, 1)) if bounds.features else 0.0
+        risk_zone.append(zone_score)
+        override.append(zone_score >= 0.6 and int(np.sum(max_scores == 1.0)) >= 2)
+
+    T2 = np.zeros((len(T2_rows), max(map(len, T2_rows), default=0)))
+    for i, row in enumerate(T2_rows):
+        T2[i, :len(row)] = row
+
+    return {
+        "window_end": np.array(ends),
+        "rows": np.array(spans),
+        "T2": T2,
+        "risk_zone": np.array(risk_zone),
+        "override": np.array(override, dtype=bool),
+    }
+
+
+def _clip(x):
+    # Matches stage1.clip, which maps NaN to 0
+    return np.where(np.isnan(x), 0.0, np.clip(x, 0.0, 1.0))
+
+
+# -----------------------------
+# Grid evaluation
+# -----------------------------
+def _score_grid(signals, thresholds, weights):
+    """
+    Stage 1 risk scores and levels for every window x alpha x weight set.
+
+    Returns (level_counts (A, K, 4), risk_sum (A, K), latest_risk (A, K),
+    latest_level (A, K)), accumulated over blocks of windows.
+    """
+    T2, rows = signals["T2"], signals["rows"]
+    scored = rows >= 2
+    n_windows, n_alpha, n_weights = len(T2), len(thresholds), len(weights)
+
+    # NaN T² (missing features) propagates, as np.mean / np.max do in Stage 1
+    T2_mean = T2.sum(axis=1) / np.maximum(rows, 1)
+    T2_max = T2.max(axis=1) if T2.shape[1] else np.zeros(n_windows)
+
+    level_counts = np.zeros((n_alpha, n_weights, len(LEVELS)), dtype=np.int64)
+    risk_sum = np.zeros((n_alpha, n_weights))
+    latest_risk = latest_level = None
+
+    block = max(1, SWEEP_BLOCK_CELLS // max(n_alpha * n_weights * max(T2.shape[1], 1), 1))
+    for lo in range(0, n_windows, block):
+        hi = min(lo + block, n_windows)
+
+        # (w, A): T² and persistence signals per alpha threshold
+        T2_score = _clip(
+            0.4 * (T2_mean[lo:hi, None] / thresholds) +
+            0.6 * (T2_max[lo:hi, None] / thresholds)
+        )
+        exceedances = (T2[lo:hi, :, None] > thresholds).sum(axis=1)
+        persistence = _clip(exceedances / 5)
+
+        # (w, A, K): risk score per weight set
+        risk = _clip(
+            weights[:, 0] * T2_score[:, :, None] +
+            weights[:, 1] * persistence[:, :, None] +
+            weights[:, 2] * signals["risk_zone"][lo:hi, None, None]
+        )
+        risk = np.where(scored[lo:hi, None, None], risk, 0.0)
+
+        level = np.searchsorted([0.20, 0.40, 0.65], risk, side="right")
+        level = np.where(signals["override"][lo:hi, None, None], 3, level)
+
+        level_counts += np.stack([(level == i).sum(axis=0) for i in range(len(LEVELS))], axis=-1)
+        risk_sum += np.round(risk, 3).sum(axis=0)
+        latest_risk, latest_level = np.round(risk[-1], 3), level[-1]
+
+    return level_counts, risk_sum, latest_risk, latest_level
+
+
+def sweep(state_df, stage1_cfg, alphas, window_days_list, weight_sets):
+    """
+    Stage 1 over a grid of alpha x window_days x risk weights.
+
+    Window moments and T² are computed once per window length
+    (window_signals); every alpha threshold and weight set is then scored
+    for all windows at once. Each row gives the share of windows per
+    anomaly level, the alert rate (share of proceed windows) and the
+    mean / latest risk score, matching run_stage1_backfill for the same
+    settings.
+    """
+    features = stage1_cfg["features"]
+    feature_bounds = stage1_cfg.get("feature_bounds", {})
+
+    thresholds = np.array([chi2_threshold(alpha, len(features)) for alpha in alphas])
+    weights = np.array([[w["t2"], w["persistence"], w["risk_zone"]] for w in weight_sets], dtype=float)
+
+    rows = []
+    for window_days in window_days_list:
+        signals = window_signals(state_df, features, feature_bounds, window_days)
+        n_windows = len(signals["T2"])
+        level_counts, risk_sum, latest_risk, latest_level = _score_grid(signals, thresholds, weights)
+
+        for a, alpha in enumerate(alphas):
+            for k, weight_set in enumerate(weight_sets):
+                shares = level_counts[a, k] / max(n_windows, 1)
+                rows.append({
+                    "window_days": window_days,
+                    "alpha": alpha,
+                    **{f"w_{key}": weight_set[key] for key in ["t2", "persistence", "risk_zone"]},
+                    "windows": n_windows,
+                    "alert_rate": float(shares[2] + shares[3]),
+                    **{f"share_{name}": float(share) for name, share in zip(LEVELS, shares)},
+                    "mean_risk_score": float(risk_sum[a, k] / max(n_windows, 1)),
+                    "latest_risk_score": float(latest_risk[a, k]) if n_windows else None,
+                    "latest_level": LEVELS[latest_level[a, k]] if n_windows else None,
+                })
+
+    return pd.DataFrame(rows)
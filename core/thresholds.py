@@ -0,0 +1,98 @@
+import math
+from functools import lru_cache
+from statistics import NormalDist
+
+
+# Convergence settings for the incomplete-gamma evaluations and the root search
+_EPS = 1e-15
+_MAX_ITER = 500
+_TINY = 1e-300
+
+
+def _gamma_series(a, x):
+    """Regularized lower incomplete gamma P(a, x) by its power series (x < a + 1)."""
+    term = total = 1.0 / a
+    denom = a
+    for _ in range(_MAX_ITER):
+        denom += 1
+        term *= x / denom
+        total += term
+        if abs(term) < abs(total) * _EPS:
+            break
+    return total * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def _gamma_continued_fraction(a, x):
+    """Regularized upper incomplete gamma Q(a, x) by Lentz's continued fraction (x >= a + 1)."""
+    b = x + 1 - a
+    c = 1 / _TINY
+    d = 1 / b
+    h = d
+    for i in range(1, _MAX_ITER):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = _TINY if abs(d) < _TINY else d
+        c = b + an / c
+        c = _TINY if abs(c) < _TINY else c
+        d = 1 / d
+        step = d * c
+        h *= step
+        if abs(step - 1) < _EPS:
+            break
+    return h * math.exp(-x + a * math.log(x) - math.lgamma(a))
+
+
+def chi2_sf(x, df):
+    """Upper tail P(X > x) of the chi-square distribution with df degrees of freedom."""
+    if x <= 0:
+        return 1.0
+    a, half = df / 2, x / 2
+    if half < a + 1:
+        return 1 - _gamma_series(a, half)
+    return _gamma_continued_fraction(a, half)
+
+
+def _chi2_pdf(x, df):
+    a = df / 2
+    return math.exp((a - 1) * math.log(x) - x / 2 - a * math.log(2) - math.lgamma(a))
+
+
+@lru_cache(maxsize=None)
+def chi2_threshold(alpha, p):
+    """
+    Upper-alpha chi-square critical value for p degrees of freedom, i.e.
+    scipy.stats.chi2.ppf(1 - alpha, p), in pure Python and memoized per
+    (alpha, p).
+
+    Starts from the Wilson–Hilferty approximation and refines it with
+    Newton steps on the upper tail, falling back to bisection whenever a
+    step leaves the bracket.
+    """
+    if not 0 < alpha < 1:
+        raise ValueError(f"alpha must be in (0, 1), got {alpha}")
+    if p < 1:
+        raise ValueError(f"Degrees of freedom must be >= 1, got {p}")
+
+    z = NormalDist().inv_cdf(1 - alpha)
+    k = 2 / (9 * p)
+    x = max(p * (1 - k + z * math.sqrt(k)) ** 3, _EPS)
+
+    lo, hi = 0.0, math.inf
+    for _ in range(_MAX_ITER):
+        excess = chi2_sf(x, p) - alpha
+        if excess > 0:
+            lo = x
+        else:
+            hi = x
+
+        step = excess / _chi2_pdf(x, p)
+        candidate = x + step
+        if not lo < candidate < hi:
+            candidate = (lo + hi) / 2 if math.isfinite(hi) else 2 * x
+
+        if abs(candidate - x) <= 4 * _EPS * x:
+            return candidate
+        x = candidate
+
+    return x
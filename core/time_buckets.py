@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+
+# Fixed-width buckets, as multiples of one minute
+FIXED_WIDTH_MINUTES = {
+    "minute": 1,
+    "5min": 5,
+    "15min": 15,
+    "hour": 60,
+    "day": 24 * 60,
+}
+
+TIME_UNITS = list(FIXED_WIDTH_MINUTES) + ["week", "month"]
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+# 1970-01-01 was a Thursday
+EPOCH_WEEKDAY = WEEKDAYS.index("thursday")
+
+
+def _to_wall_clock(dates: pd.Series, timezone: str | None) -> pd.Series:
+    """
+    Naive wall-clock times in the bucketing timezone.
+    Naive input is taken as UTC when a timezone is given.
+    """
+    tz = dates.dt.tz
+
+    if timezone is None:
+        return dates if tz is None else dates.dt.tz_localize(None)
+
+    if tz is None:
+        dates = dates.dt.tz_localize("UTC")
+    return dates.dt.tz_convert(timezone).dt.tz_localize(None)
+
+
+def bucket_times(
+    dates: pd.Series,
+    time_unit: str,
+    week_start: str = "monday",
+    timezone: str | None = None) -> pd.Series:
+    """
+    Floor timestamps to the start of their time bucket.
+
+    Works on the integer epoch representation: fixed-width buckets are a
+    single modulo, weeks are day numbers shifted to the configured week
+    start, months are a datetime64[M] cast. No per-row Python calls.
+
+    Parameters
+    ----------
+    dates : pd.Series
+        datetime64 series (naive or tz-aware)
+    time_unit : str
+        One of TIME_UNITS
+    week_start : str
+        First day of a "week" bucket (ISO weeks start on monday)
+    timezone : str, optional
+        Timezone whose wall clock defines bucket boundaries.
+        Tz-aware input defaults to its own timezone.
+
+    Returns
+    -------
+    pd.Series
+        Naive bucket start times, same index and resolution as the input
+    """
+
+    if time_unit not in TIME_UNITS:
+        raise ValueError(f"time_unit must be one of {TIME_UNITS}")
+    if week_start not in WEEKDAYS:
+        raise ValueError(f"week_start must be one of {WEEKDAYS}")
+
+    values = _to_wall_clock(dates, timezone).to_numpy()
+    unit, _ = np.datetime_data(values.dtype)
+
+    ticks = values.view("i8")
+    missing = np.isnat(values)
+    ticks_per_day = np.timedelta64(1, "D") // np.timedelta64(1, unit)
+
+    if time_unit == "month":
+        # Calendar math only for each distinct day in range, then a gather
+        days = np.where(missing, 0, ticks // ticks_per_day)
+        first, last = (days[~missing].min(), days[~missing].max()) if (~missing).any() else (0, 0)
+
+        day_range = np.arange(first, last + 1).astype("datetime64[D]")
+        month_start = day_range.astype("datetime64[M]").astype("datetime64[D]").view("i8")
+        floored = month_start[np.clip(days - first, 0, None)] * ticks_per_day
+    elif time_unit == "week":
+        days = ticks // ticks_per_day
+        offset = (days + EPOCH_WEEKDAY - WEEKDAYS.index(week_start)) % 7
+        floored = (days - offset) * ticks_per_day
+    else:
+        width = np.timedelta64(FIXED_WIDTH_MINUTES[time_unit], "m") // np.timedelta64(1, unit)
+        floored = ticks - ticks % width
+
+    keys = floored.view(values.dtype)
+    keys[missing] = np.datetime64("NaT")
+
+    return pd.Series(keys, index=dates.index, name=dates.name)
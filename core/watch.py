@@ -0,0 +1,311 @@
+import bisect
+import io
+import os
+import pickle
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from core.state_builder import StateAccumulator
+
+
+# Most bytes a tail source reads per call (a longer line is read whole)
+BLOCK_BYTES = 64 << 20
+
+# Layout of the watch state file; a file with another version is ignored
+STATE_VERSION = 2
+
+
+# -----------------------------
+# Sources of new raw rows
+# -----------------------------
+class CsvTailSource:
+    """
+    New rows appended to a CSV since the last read.
+
+    Reads at most block_bytes per call, so a large backlog is consumed
+    over several calls. Only complete lines are consumed; a partially
+    written last line is left for the next call. A file that shrank is
+    treated as replaced and read again from the top.
+    """
+
+    def __init__(self, path, columns=None, block_bytes=BLOCK_BYTES):
+        self.path = Path(path)
+        self.columns = columns
+        self.block_bytes = block_bytes
+        self.offset = 0
+        self.header = None
+
+    @property
+    def position(self):
+        return {"offset": self.offset, "header": self.header}
+
+    def restore(self, position):
+        self.offset = position["offset"]
+        self.header = position["header"]
+
+    def read_new(self):
+        if not self.path.exists():
+            return None
+
+        if self.path.stat().st_size < self.offset:
+            self.offset, self.header = 0, None
+
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(self.block_bytes)
+            # A line longer than the block: read on until it ends
+            while b"\n" not in data and len(data) % self.block_bytes == 0:
+                block = f.read(self.block_bytes)
+                if not block:
+                    break
+                data += block
+
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return None
+
+        data = data[:end]
+        self.offset += end
+
+        if self.header is None:
+            header_end = data.index(b"\n") + 1
+            self.header = data[:header_end]
+            data = data[header_end:]
+
+        if not data.strip():
+            return None
+        return pd.read_csv(io.BytesIO(self.header + data), usecols=self.columns)
+
+
+class DropDirectorySource:
+    """
+    Whole CSV files dropped into a directory, each read once in
+    (mtime, name) order. Writers should move finished files in atomically
+    (write elsewhere, then rename) so no file is read half-written.
+    """
+
+    def __init__(self, path, columns=None, pattern="*.csv"):
+        self.path = Path(path)
+        self.columns = columns
+        self.pattern = pattern
+        self.seen = set()
+
+    @property
+    def position(self):
+        return {"seen": sorted(self.seen)}
+
+    def restore(self, position):
+        self.seen = set(position["seen"])
+
+    def read_new(self):
+        new = [p for p in self.path.glob(self.pattern) if p.name not in self.seen]
+        if not new:
+            return None
+
+        new.sort(key=lambda p: (p.stat().st_mtime, p.name))
+        frames = [pd.read_csv(p, usecols=self.columns) for p in new]
+        self.seen.update(p.name for p in new)
+
+        return pd.concat(frames, ignore_index=True)
+
+
+def make_source(path, columns=None):
+    """Drop-directory source for a directory, tail source for a file."""
+    if Path(path).is_dir():
+        return DropDirectorySource(path, columns)
+    return CsvTailSource(path, columns)
+
+
+# -----------------------------
+# Watcher
+# -----------------------------
+class Watcher:
+    """
+    Incremental pipeline over append-only raw data.
+
+    Each poll folds only the new rows into a StateAccumulator, reading
+    the source block by block. The newest bucket is still open; once rows
+    for a later bucket arrive it closes, Stage 1 is scored on the closed
+    buckets it can see (the last window_days plus the window_days rows
+    before them that Stage 2 uses as baseline), and Stages 2–5 run only
+    when the gate says proceed. Rows arriving late for a closed bucket
+    update it and are picked up at the next close. The cost of a poll
+    follows the number of new rows and the window, not the history.
+
+    The accumulator and source position are checkpointed to state_path
+    at most every checkpoint_seconds (and when run() stops), so a
+    restarted watcher resumes from the last checkpoint and re-reads the
+    rows after it. Watch mode scores the global state only (no
+    segment_keys).
+    """
+
+    def __init__(self, pipeline, source_path, state_path=".caden_cache/watch.pkl", on_result=None,
+                 checkpoint_seconds=60.0):
+        self.pipeline = pipeline
+        self.state_path = Path(state_path) if state_path else None
+        self.on_result = on_result or _print_result
+        self.checkpoint_seconds = checkpoint_seconds
+
+        state_cfg = pipeline.config["state_builder"]
+        self.accumulator = StateAccumulator(
+            date_column=state_cfg["date_column"],
+            time_unit=state_cfg["time_unit"],
+            aggregation_config=state_cfg["aggregations"],
+            date_format=state_cfg.get("date_format"),
+            week_start=state_cfg.get("week_start", "monday"),
+            timezone=state_cfg.get("timezone")
+        )
+        self.source = make_source(source_path, self.accumulator.columns)
+
+        window_days = pipeline.config["stage1"].get("window_days", 14)
+        self.window = timedelta(days=window_days)
+        self.baseline_rows = window_days
+
+        # Sorted bucket times seen so far
+        self.times = []
+        self.open_bucket = None
+        self.last_scored = None
+
+        self._dirty = False
+        self._saved_at = None
+
+        if self.state_path is not None and self.state_path.exists():
+            self._load()
+
+    @property
+    def state_df(self):
+        """Full state built so far, indexed by time (for inspection)."""
+        return self.accumulator.finalize().set_index("time")
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def _load(self):
+        with open(self.state_path, "rb") as f:
+            saved = pickle.load(f)
+
+        if saved.get("version") != STATE_VERSION:
+            return
+
+        self.accumulator = saved["accumulator"]
+        self.source.restore(saved["position"])
+        self.times = saved["times"]
+        self.open_bucket = saved["open_bucket"]
+        self.last_scored = saved["last_scored"]
+
+    def _save(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_path.with_suffix(".tmp")
+
+        with open(tmp, "wb") as f:
+            pickle.dump({
+                "version": STATE_VERSION,
+                "accumulator": self.accumulator,
+                "position": self.source.position,
+                "times": self.times,
+                "open_bucket": self.open_bucket,
+                "last_scored": self.last_scored,
+            }, f)
+        os.replace(tmp, self.state_path)
+
+        self._dirty = False
+        self._saved_at = time.monotonic()
+
+    def checkpoint(self, force=False):
+        """Save unsaved state when checkpoint_seconds have passed (or always with force)."""
+        if self.state_path is None or not self._dirty:
+            return
+        if force or self._saved_at is None or time.monotonic() - self._saved_at >= self.checkpoint_seconds:
+            self._save()
+
+    # -----------------------------
+    # Polling
+    # -----------------------------
+    def _fold(self, rows):
+        keys = self.accumulator.update(rows)
+
+        for key in keys:
+            i = bisect.bisect_left(self.times, key)
+            if i == len(self.times) or self.times[i] != key:
+                self.times.insert(i, key)
+
+        return keys.max()
+
+    def _closed_tail(self, last_closed):
+        """State rows Stage 1–2 need to score the window ending at last_closed."""
+        stop = bisect.bisect_right(self.times, last_closed)
+        start = bisect.bisect_left(self.times, last_closed - self.window, 0, stop)
+        keys = self.times[max(start - self.baseline_rows, 0):stop]
+        return self.accumulator.finalize(pd.Index(keys, name="time_key"))
+
+    def poll(self):
+        """
+        Fold new rows; returns a PipelineResult when a bucket closed and
+        Stage 1 was rescored, else None.
+        """
+        newest = None
+        while (rows := self.source.read_new()) is not None:
+            if not rows.empty:
+                key = self._fold(rows)
+                newest = key if newest is None else max(newest, key)
+                self._dirty = True
+        if newest is None:
+            return None
+
+        if self.open_bucket is None or newest > self.open_bucket:
+            self.open_bucket = newest
+
+        result = None
+        closed = bisect.bisect_left(self.times, self.open_bucket)
+
+        if closed and self.times[closed - 1] != self.last_scored:
+            self.last_scored = self.times[closed - 1]
+            result = self.pipeline.score(self._closed_tail(self.last_scored))
+
+            if result.decision_gate == "proceed":
+                result = self.pipeline.run_downstream(result)
+
+        self.checkpoint()
+        return result
+
+    def run(self, poll_seconds=5.0, max_polls=None):
+        """Poll until interrupted (or for max_polls polls); checkpoints on the way out."""
+        polls = 0
+        try:
+            while max_polls is None or polls < max_polls:
+                start = time.perf_counter()
+                result = self.poll()
+                if result is not None:
+                    self.on_result(result, time.perf_counter() - start)
+
+                polls += 1
+                time.sleep(poll_seconds)
+        except KeyboardInterrupt:
+            print("\nWatch stopped.")
+        finally:
+            self.checkpoint(force=True)
+
+
+def _print_result(result, seconds):
+    stage1 = result.stage1
+    print(
+        f"[{stage1.get('window_end')}] anomaly level: {stage1.get('anomaly_level')}, "
+        f"risk score: {stage1.get('risk_score')}, gate: {result.decision_gate} "
+        f"({seconds:.3f}s)"
+    )
+
+    if result.decision_gate == "proceed":
+        print("\nStage 3 Output:")
+        print(result.stage3)
+
+        print("\nStage 4 Summary:")
+        print(result.stage4)
+
+        print("\nStage 5 Metrics:")
+        print("NCI:", round(result.stage5["nci"], 3))
+        print("DER:", round(result.stage5["der"], 3))
+        print("CDS:", round(result.stage5["cds"], 3))
+        print()
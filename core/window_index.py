@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+
+# cross_products="auto" keeps the cross-product prefixes when they fit here
+CROSS_PRODUCT_MAX_BYTES = 256 * 1024 ** 2
+
+
+def _prefix(values):
+    """
+    Cumulative sums along the last (time) axis with a leading zero column.
+    Series are kept as contiguous rows, which keeps the cumsum fast.
+    """
+    out = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=values.dtype)
+    np.cumsum(values, axis=-1, out=out[..., 1:])
+    return out
+
+
+class WindowStatsIndex:
+    """
+    Prefix-sum index over a time-ordered state_df.
+
+    Built once from cumulative counts, sums and sums of squares of the
+    feature matrix, it answers per-feature mean and variance for any row
+    range [lo, hi) in O(p), however long the range. With cross_products
+    the pairwise cross-products are accumulated too (p(p+1)/2 prefixes of
+    the full history), and covariance for any range costs O(p²);
+    without, covariance is formed from the range's own rows in O(W·p²).
+    "auto" keeps them while they fit in CROSS_PRODUCT_MAX_BYTES. Values
+    are shifted by the column means before accumulating so range
+    differences keep their precision.
+
+    Ranges are row positions in time order; window() and before() map
+    time bounds to ranges, and rows() / positions() give the rows themselves
+    when a stage needs them (e.g. per-row T²).
+    """
+
+    def __init__(self, df, time_column, features, cross_products="auto"):
+        times = pd.to_datetime(df[time_column]).to_numpy()
+        self.order = np.argsort(times, kind="stable")
+        self.times = times[self.order]
+        self.features = list(features)
+        self.X = df[self.features].to_numpy(dtype=float)[self.order]
+
+        valid = ~np.isnan(self.X)
+        filled = np.where(valid, self.X, 0.0)
+        n = valid.sum(axis=0)
+        self.shift = filled.sum(axis=0) / np.maximum(n, 1)
+
+        # Feature-major (p, n) so every prefix runs along contiguous memory
+        self._Z = np.ascontiguousarray(np.where(valid, self.X - self.shift, 0.0).T)
+        self._count = _prefix(np.ascontiguousarray(valid.T).astype(np.int64))
+        self._sum = _prefix(self._Z)
+        self._sumsq = _prefix(self._Z ** 2)
+
+        p = len(self.features)
+        if cross_products == "auto":
+            cross_products = p * (p + 1) // 2 * (len(self.times) + 1) * 8 <= CROSS_PRODUCT_MAX_BYTES
+
+        # Upper-triangle cross-products, one prefix per feature pair
+        self._cross = None
+        if cross_products:
+            rows, cols = np.triu_indices(p)
+            self._cross = rows, cols, _prefix(self._Z[rows] * self._Z[cols])
+
+    def _range(self, prefix, lo, hi):
+        return prefix[..., hi] - prefix[..., lo]
+
+    def __len__(self):
+        return len(self.times)
+
+    # -----------------------------
+    # Ranges
+    # -----------------------------
+    def window(self, start, end):
+        """Row range of times in [start, end]."""
+        lo = int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(start)), side="left"))
+        hi = int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(end)), side="right"))
+        return lo, max(lo, hi)
+
+    def before(self, start, rows):
+        """Row range of the last `rows` rows strictly before start."""
+        hi = int(np.searchsorted(self.times, np.datetime64(pd.Timestamp(start)), side="left"))
+        return max(hi - rows, 0), hi
+
+    def rows(self, lo, hi):
+        return self.X[lo:hi]
+
+    def positions(self, lo, hi):
+        """Positions in the original df of the rows in [lo, hi)."""
+        return self.order[lo:hi]
+
+    # -----------------------------
+    # Statistics
+    # -----------------------------
+    def count(self, lo, hi):
+        """Non-missing values per feature."""
+        return self._range(self._count, lo, hi)
+
+    def nanmean(self, lo, hi):
+        n = self.count(lo, hi)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(n > 0, self._range(self._sum, lo, hi) / n, np.nan) + self.shift
+
+    def nanvar(self, lo, hi, ddof=1):
+        """Per-feature variance over the non-missing values."""
+        n = self.count(lo, hi)
+        total = self._range(self._sum, lo, hi)
+        squares = self._range(self._sumsq, lo, hi)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (squares - total ** 2 / n) / (n - ddof)
+        return np.where(n > ddof, np.maximum(var, 0.0), np.nan)
+
+    def moments(self, lo, hi):
+        """
+        Mean and sample covariance (ddof=1) of rows [lo, hi), matching
+        core.hotelling.estimate_moments: a feature with any missing value
+        in the range gets NaN mean, variance and covariances.
+        """
+        n = hi - lo
+        complete = self.count(lo, hi) == n
+
+        # Missing values are zero in _Z; their features are masked below
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_z = self._range(self._sum, lo, hi) / n
+
+            if self._cross is not None:
+                rows, cols, cross = self._cross
+                upper = (self._range(cross, lo, hi) - n * mean_z[rows] * mean_z[cols]) / (n - 1)
+                Sigma = np.empty((len(self.features), len(self.features)))
+                Sigma[rows, cols] = upper
+                Sigma[cols, rows] = upper
+            else:
+                Z = self._Z[:, lo:hi]
+                Sigma = (Z @ Z.T - n * np.outer(mean_z, mean_z)) / (n - 1)
+
+        mu = np.where(complete, mean_z + self.shift, np.nan)
+        Sigma = np.where(complete[:, None] & complete[None, :], Sigma, np.nan)
+        return mu, Sigma
+
+    def correlation(self, lo, hi, columns=None):
+        """Pearson correlation of rows [lo, hi) (like np.corrcoef; NaN features give NaN)."""
+        _, Sigma = self.moments(lo, hi)
+        if columns is not None:
+            Sigma = Sigma[np.ix_(columns, columns)]
+
+        scale = np.sqrt(np.diagonal(Sigma))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = Sigma / scale[:, None] / scale[None, :]
+        return np.clip(corr, -1, 1)
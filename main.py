@@ -1,120 +1,162 @@
-import pandas as pd
-import yaml
-
-from core.state_builder import build_system_state
-from core.stage1 import run_stage1_v2
-from core.stage2 import run_stage2_v2
-from core.stage3 import run_stage3_v2
-from core.stage4 import run_stage4_llm
-from core.stage5 import compute_nci, compute_der, compute_cds
-
-
-with open("config.yaml") as f:
-    config = yaml.safe_load(f)
-
-# Load raw data
-df_raw = pd.read_csv(config["data"]["path"])
-
-# Build system state 
-state_df = build_system_state(
-    df_raw=df_raw,
-    date_column=config["state_builder"]["date_column"],
-    time_unit=config["state_builder"]["time_unit"],
-    aggregation_config=config["state_builder"]["aggregations"],
-    date_format=config["state_builder"].get("date_format")
-)
-
-# Stage 1 v2
-stage1_out = run_stage1_v2(
-    df=state_df,
-    time_column="time",
-    feature_list=config["stage1"]["features"],
-    feature_bounds=config["stage1"]["feature_bounds"],
-    window_days=config["stage1"]["window_days"],
-    alpha=config["stage1"]["alpha"],
-    weights=config["stage1"]["risk_weights"]
-)
-
-
-print(stage1_out)
-print("\n--- Conditional Routing ---")
-
-anomaly_level = stage1_out.get("anomaly_level")
-decision_gate = stage1_out.get("decision_gate")
-
-# -----------------------------
-# Case 1: No or Marginal Anomaly
-# -----------------------------
-if decision_gate == "stop":
-
-    print(f"No deep analysis required (anomaly level: {anomaly_level}).")
-
-    stage4_out = run_stage4_llm(
-        stage1_output=stage1_out,
-        stage2_output=None,
-        stage3_output=None
+import argparse
+
+from core.pipeline import Pipeline
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run the CADEN pipeline")
+    parser.add_argument("--config", default="config.yaml", help="Path to the use-case config")
+    parser.add_argument("--profile", action="store_true", default=None,
+                        help="cProfile each stage (overrides pipeline.profile)")
+    parser.add_argument("--trace-memory", action="store_true", default=None,
+                        help="Record tracemalloc peak per stage (overrides pipeline.trace_memory)")
+    parser.add_argument("--profile-dir", default=None, help="Write per-stage .prof files here")
+    parser.add_argument("--watch", default=None, metavar="PATH",
+                        help="Tail an append-only CSV or a drop directory and score each closed time bucket")
+    parser.add_argument("--usecases", nargs="+", default=None, metavar="CONFIG",
+                        help="Run several use-case configs concurrently over shared-memory data")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes for --usecases")
+    parser.add_argument("--report", default=None, help="Write the --usecases report as JSON here")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT",
+                        help="Keep config and state warm behind a local HTTP scoring service")
+    parser.add_argument("--host", default="127.0.0.1", help="Service bind address")
+    parser.add_argument("--poll-seconds", type=float, default=5.0, help="Watch mode poll interval")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Score Stage 1 over a grid of alpha, window_days and risk weights")
+    parser.add_argument("--alphas", default=None, help="Comma-separated alphas for --sweep (default: config)")
+    parser.add_argument("--windows", default=None, help="Comma-separated window_days for --sweep (default: config)")
+    parser.add_argument("--weight", action="append", default=[], metavar="KEY=V1,V2",
+                        help="Risk weight values for --sweep, e.g. t2=0.25,0.35 (repeatable)")
+    parser.add_argument("--sweep-output", default=None, help="Write the --sweep grid as CSV here")
+    parser.add_argument("--watch-state", default=".caden_cache/watch.pkl",
+                        help="Where watch mode persists its state between restarts")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    # Mode modules are imported only when their mode is used
+    if args.usecases:
+        from core.runner import print_report, run_usecases, write_report
+
+        report = run_usecases(args.usecases, n_jobs=args.jobs)
+        print_report(report)
+        if args.report:
+            write_report(report, args.report)
+        return
+
+    pipeline = Pipeline.from_config_file(
+        args.config,
+        profile=args.profile,
+        trace_memory=args.trace_memory,
+        profile_dir=args.profile_dir
     )
 
-    print("\nStage 4 Summary:")
-    print(stage4_out)
+    if args.serve is not None:
+        from core.service import serve
 
-    print("\nStage 5 Metrics:")
-    print("NCI: N/A")
-    print("DER: N/A")
-    print("CDS: N/A")
+        serve(pipeline, args.host, args.serve)
+        return
 
-# -----------------------------
-# Case 2: Moderate / Strong Anomaly
-# -----------------------------
-else:
+    if args.sweep:
+        from core.sweep import expand_weight_grid, sweep
 
-    print(f"Anomaly detected (level: {anomaly_level}). Running full pipeline.")
+        stage1_cfg = pipeline.config["stage1"]
+        alphas = [float(a) for a in args.alphas.split(",")] if args.alphas else [stage1_cfg.get("alpha", 0.01)]
+        windows = [int(w) for w in args.windows.split(",")] if args.windows else [stage1_cfg.get("window_days", 14)]
+        weight_sets = expand_weight_grid(
+            {key: [float(v) for v in values.split(",")] for key, values in (w.split("=", 1) for w in args.weight)},
+            stage1_cfg.get("risk_weights")
+        )
 
-    # ---- Stage 2 ----
-    stage2_out = run_stage2_v2(
-        state_df=state_df,
-        stage1_output=stage1_out,
-        features=config["stage1"]["features"],
-        baseline_days=config["stage1"]["window_days"]
-    )
+        grid = sweep(pipeline.build_state(), stage1_cfg, alphas, windows, weight_sets)
+        print(grid.sort_values(["window_days", "alpha"]).to_string(index=False))
+        if args.sweep_output:
+            grid.to_csv(args.sweep_output, index=False)
+        return
 
-    print("\nStage 2 Output:")
-    print(stage2_out)
+    if args.watch:
+        from core.watch import Watcher
 
-    # ---- Stage 3 ----
-    stage3_out = run_stage3_v2(
-        stage2_output=stage2_out,
-        stage1_output=stage1_out,
-        hypotheses_config=config["stage3"]["hypotheses"]
-    )
+        print(f"Watching {args.watch} (Ctrl+C to stop)")
+        Watcher(pipeline, args.watch, state_path=args.watch_state).run(args.poll_seconds)
+        return
 
-    print("\nStage 3 Output:")
-    print(stage3_out)
+    result = pipeline.run()
 
-    # ---- Stage 4 ----
-    stage4_out = run_stage4_llm(
-        stage1_output=stage1_out,
-        stage2_output=stage2_out,
-        stage3_output=stage3_out
-    )
+    if pipeline.ingest_report is not None:
+        report = pipeline.ingest_report
+        print(
+            f"Ingest: {report['rows']} rows, {report['columns_read']}/{report['columns_total']} columns, "
+            f"{report['memory_mb']} MB (default read ~{report['default_memory_mb']} MB, "
+            f"saved {report['saved_mb']} MB)"
+        )
+
+    if pipeline.state_cache is not None:
+        print("State cache:", pipeline.state_cache.stats())
+
+    print(result.stage1)
+
+    # Stage 1 per segment (optional)
+    if result.segments is not None:
+        flagged = [s for s in result.segments if s["decision_gate"] == "proceed"]
+        flagged.sort(key=lambda s: s["risk_score"], reverse=True)
+
+        print(f"\nSegments flagged: {len(flagged)} of {len(result.segments)}")
+        for s in flagged[:10]:
+            print(s["segment"], s["anomaly_level"], s["risk_score"])
+
+    print("\n--- Conditional Routing ---")
+
+    anomaly_level = result.stage1.get("anomaly_level")
+
+    # -----------------------------
+    # Case 1: No or Marginal Anomaly
+    # -----------------------------
+    if result.decision_gate == "stop":
+
+        print(f"No deep analysis required (anomaly level: {anomaly_level}).")
+
+        print("\nStage 4 Summary:")
+        print(result.stage4)
+
+        print("\nStage 5 Metrics:")
+        print("NCI: N/A")
+        print("DER: N/A")
+        print("CDS: N/A")
+
+    # -----------------------------
+    # Case 2: Moderate / Strong Anomaly
+    # -----------------------------
+    else:
+
+        print(f"Anomaly detected (level: {anomaly_level}). Running full pipeline.")
+
+        print("\nStage 2 Output:")
+        print(result.stage2)
+
+        print("\nStage 3 Output:")
+        print(result.stage3)
+
+        print("\nStage 4 Summary:")
+        print(result.stage4)
+
+        if pipeline.narrative_cache is not None:
+            print("Narrative cache:", pipeline.narrative_cache.stats())
 
-    print("\nStage 4 Summary:")
-    print(stage4_out)
+        print("\nStage 5 Metrics:")
+        print("NCI:", round(result.stage5["nci"], 3))
+        print("DER:", round(result.stage5["der"], 3))
+        print("CDS:", round(result.stage5["cds"], 3))
 
-    # ---- Stage 5 ----
-    prior_probs = [h["prior"] for h in stage3_out]
-    post_probs = [h["posterior"] for h in stage3_out]
+    print("\nStage timings:")
+    print(result.timing_table().to_string(index=False))
 
-    causal_influences = {
-        h["hypothesis"]: h["posterior"]
-        for h in stage3_out
-    }
+    for name, summary in result.profiles.items():
+        print(f"\n--- Profile: {name} ---")
+        print(summary)
 
-    nci = compute_nci(stage3_out)
-    der = compute_der(prior_probs, post_probs)
-    cds = compute_cds(causal_influences)
 
-    print("\nStage 5 Metrics:")
-    print("NCI:", round(nci, 3))
-    print("DER:", round(der, 3))
-    print("CDS:", round(cds, 3))
+if __name__ == "__main__":
+    main()
@@ -1,149 +1,303 @@
-import numpy as np
-import pandas as pd
+import argparse
 from pathlib import Path
 
+import numpy as np
+import pandas as pd
 
-np.random.seed(42)
 
 # -----------------------------
 # Configuration
 # -----------------------------
 N_DAYS = 200
 N_PARTS = 500
-ANOMALY_RATE = 0.10 # 0% rows anomalous
+ANOMALY_RATE = 0.10 # 10% rows anomalous
+START_DATE = "2024-01-01"
+RANDOM_SEED = 42
+
+# Rows generated (and written) per chunk; bounds peak memory at any scale
+CHUNK_ROWS = 1_000_000
 
 SUPPLIERS = [f"S{i:02d}" for i in range(1, 21)]
 LOCATIONS = [f"LOC{i:02d}" for i in range(1, 11)]
 PART_FAMILIES = ["Electrical", "Mechanical", "Hydraulics", "Fasteners",
                  "Plastics", "Electronics", "Bearings", "Packaging"]
 
-dates = pd.date_range("2024-01-01", periods=N_DAYS, freq="D")
+ANOMALY_TYPES = ["demand_spike", "supply_disruption", "data_quality"]
+ANOMALY_PROBS = [0.4, 0.4, 0.2]
+NO_ANOMALY = "none"
+
+# Episode mode (--episodes): share of parts hit on an episode day, and
+# days at the start kept clean as a baseline
+EPISODE_PART_SHARE = 0.8
+EPISODE_WARMUP_DAYS = 30
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT = PROJECT_ROOT / "data" / "parts_dw_happy_path_100k.csv"
+
 
 # -----------------------------
 # Master data
 # -----------------------------
-parts = []
-for i in range(N_PARTS):
-    parts.append({
-        "part_number": f"P{i:05d}",
-        "part_family": np.random.choice(PART_FAMILIES),
-        "supplier_id": np.random.choice(SUPPLIERS),
-        "supplier_name": None,  # filled later
-        "inventory_location": np.random.choice(LOCATIONS),
-        "part_unit_cost": round(np.random.uniform(5, 200), 2)
+def generate_parts(n_parts, rng):
+    supplier_id = rng.choice(SUPPLIERS, n_parts)
+
+    return pd.DataFrame({
+        "part_number": [f"P{i:05d}" for i in range(n_parts)],
+        "part_family": rng.choice(PART_FAMILIES, n_parts),
+        "supplier_id": supplier_id,
+        "supplier_name": np.char.add("Supplier_", supplier_id),
+        "inventory_location": rng.choice(LOCATIONS, n_parts),
+        "part_unit_cost": rng.uniform(5, 200, n_parts).round(2)
     })
 
-parts_df = pd.DataFrame(parts)
-parts_df["supplier_name"] = parts_df["supplier_id"].apply(lambda x: f"Supplier_{x}")
 
 # -----------------------------
-# Generate base daily records
+# Daily records for a block of parts
 # -----------------------------
-rows = []
-
-for _, part in parts_df.iterrows():
-    base_demand = np.random.randint(20, 100)
-    base_lead_time = np.random.randint(5, 20)
-
-    inventory = np.random.randint(500, 2000)
-
-    for date in dates:
-        daily_demand = max(0, int(np.random.normal(base_demand, base_demand * 0.1)))
-        forecast_demand = int(base_demand * np.random.uniform(0.9, 1.1))
-        order_qty = daily_demand + np.random.randint(-5, 5)
-
-        inventory -= daily_demand
-        inventory = max(inventory, 0)
-
-        backorder_qty = max(0, daily_demand - inventory)
-
-        supplier_lead_time = max(1, int(np.random.normal(base_lead_time, 2)))
-        supplier_delay = max(0, supplier_lead_time - base_lead_time)
-
-        production_output = max(0, daily_demand + np.random.randint(-10, 10))
-        fulfillment_rate = min(1.0, production_output / max(daily_demand, 1))
-
-        inventory_turnover = daily_demand / max(inventory + 1, 1)
-        days_of_inventory = inventory / max(daily_demand, 1)
-
-        procurement_cost = order_qty * part["part_unit_cost"]
-        transportation_cost = procurement_cost * np.random.uniform(0.05, 0.15)
-        inventory_holding_cost = inventory * part["part_unit_cost"] * 0.01
-        total_part_cost = procurement_cost + transportation_cost + inventory_holding_cost
-
-        rows.append({
-            "date": date,
-            "part_number": part["part_number"],
-            "part_family": part["part_family"],
-            "supplier_id": part["supplier_id"],
-            "supplier_name": part["supplier_name"],
-            "inventory_location": part["inventory_location"],
-
-            "daily_demand_qty": daily_demand,
-            "forecast_demand_qty": forecast_demand,
-            "order_qty": order_qty,
-            "backorder_qty": backorder_qty,
-
-            "on_hand_inventory_qty": inventory,
-            "inventory_lead_time_days": supplier_lead_time,
-            "inventory_turnover_ratio": inventory_turnover,
-            "days_of_inventory": days_of_inventory,
-
-            "supplier_lead_time_days": supplier_lead_time,
-            "supplier_fill_rate": fulfillment_rate,
-            "supplier_delay_days": supplier_delay,
-
-            "part_unit_cost": part["part_unit_cost"],
-            "inventory_holding_cost": inventory_holding_cost,
-            "procurement_cost": procurement_cost,
-            "transportation_cost": transportation_cost,
-            "total_part_cost": total_part_cost,
-
-            "production_output_qty": production_output,
-            "order_fulfillment_rate": fulfillment_rate
-        })
+def generate_daily_records(parts, dates, rng):
+    """
+    Daily KPIs for every (part, date) pair as (parts, days) arrays,
+    flattened part-major into one DataFrame.
+    """
+    n_parts, n_days = len(parts), len(dates)
+    shape = (n_parts, n_days)
+
+    base_demand = rng.integers(20, 100, n_parts)[:, None]
+    base_lead_time = rng.integers(5, 20, n_parts)[:, None]
+    start_inventory = rng.integers(500, 2000, n_parts)[:, None]
+    unit_cost = parts["part_unit_cost"].to_numpy()[:, None]
+
+    daily_demand = np.maximum(0, np.trunc(rng.normal(base_demand, base_demand * 0.1, shape))).astype(np.int64)
+    forecast_demand = np.trunc(base_demand * rng.uniform(0.9, 1.1, shape)).astype(np.int64)
+    order_qty = daily_demand + rng.integers(-5, 5, shape)
+
+    # Demand is non-negative, so clipping at zero each day equals clipping the running total
+    inventory = np.maximum(start_inventory - np.cumsum(daily_demand, axis=1), 0)
+
+    backorder_qty = np.maximum(0, daily_demand - inventory)
+
+    supplier_lead_time = np.maximum(1, np.trunc(rng.normal(base_lead_time, 2, shape))).astype(np.int64)
+    supplier_delay = np.maximum(0, supplier_lead_time - base_lead_time)
+
+    production_output = np.maximum(0, daily_demand + rng.integers(-10, 10, shape))
+    fulfillment_rate = np.minimum(1.0, production_output / np.maximum(daily_demand, 1))
+
+    inventory_turnover = daily_demand / np.maximum(inventory + 1, 1)
+    days_of_inventory = inventory / np.maximum(daily_demand, 1)
+
+    procurement_cost = order_qty * unit_cost
+    transportation_cost = procurement_cost * rng.uniform(0.05, 0.15, shape)
+    inventory_holding_cost = inventory * unit_cost * 0.01
+    total_part_cost = procurement_cost + transportation_cost + inventory_holding_cost
+
+    def per_part(column):
+        return np.repeat(parts[column].to_numpy(), n_days)
+
+    return pd.DataFrame({
+        "date": np.tile(dates, n_parts),
+        "part_number": per_part("part_number"),
+        "part_family": per_part("part_family"),
+        "supplier_id": per_part("supplier_id"),
+        "supplier_name": per_part("supplier_name"),
+        "inventory_location": per_part("inventory_location"),
+
+        "daily_demand_qty": daily_demand.ravel(),
+        "forecast_demand_qty": forecast_demand.ravel(),
+        "order_qty": order_qty.ravel(),
+        "backorder_qty": backorder_qty.ravel(),
+
+        "on_hand_inventory_qty": inventory.ravel(),
+        "inventory_lead_time_days": supplier_lead_time.ravel(),
+        "inventory_turnover_ratio": inventory_turnover.ravel(),
+        "days_of_inventory": days_of_inventory.ravel(),
+
+        "supplier_lead_time_days": supplier_lead_time.ravel(),
+        "supplier_fill_rate": fulfillment_rate.ravel(),
+        "supplier_delay_days": supplier_delay.ravel(),
+
+        "part_unit_cost": per_part("part_unit_cost"),
+        "inventory_holding_cost": inventory_holding_cost.ravel(),
+        "procurement_cost": procurement_cost.ravel(),
+        "transportation_cost": transportation_cost.ravel(),
+        "total_part_cost": total_part_cost.ravel(),
+
+        "production_output_qty": production_output.ravel(),
+        "order_fulfillment_rate": fulfillment_rate.ravel()
+    })
 
-df = pd.DataFrame(rows)
 
 # -----------------------------
 # Inject structured anomalies
 # -----------------------------
-n_anomalies = int(len(df) * ANOMALY_RATE)
-anomaly_indices = np.random.choice(df.index, n_anomalies, replace=False)
+def plan_episodes(n_days, anomaly_rate, n_episodes, rng):
+    """
+    Anomaly type per day (-1 for none): n_episodes contiguous runs of days,
+    one type each, spread over the days after EPISODE_WARMUP_DAYS and long
+    enough that about anomaly_rate of all rows are anomalous.
+    """
+    day_kinds = np.full(n_days, -1)
+    warmup = min(EPISODE_WARMUP_DAYS, n_days // 2)
+    slot = (n_days - warmup) // n_episodes
+    length = int(np.clip(round(anomaly_rate * n_days / (EPISODE_PART_SHARE * n_episodes)), 1, max(slot // 2, 1)))
+
+    for i in range(n_episodes):
+        start = warmup + i * slot + rng.integers(0, max(slot - length, 0) + 1)
+        day_kinds[start:start + length] = rng.choice(len(ANOMALY_TYPES), p=ANOMALY_PROBS)
+
+    return day_kinds
+
+
+def inject_anomalies(df, anomaly_rate, rng, day_kinds=None):
+    """
+    Apply demand spikes, supply disruptions and data-quality errors in
+    place, and label every row with is_anomaly / anomaly_type.
+
+    Rows are picked at random (an anomaly_rate share of them), or, with
+    day_kinds from plan_episodes, EPISODE_PART_SHARE of the parts on each
+    episode day get that day's anomaly type.
+    """
+    if day_kinds is None:
+        n_anomalies = int(len(df) * anomaly_rate)
+        rows = rng.choice(len(df), n_anomalies, replace=False)
+        kinds = rng.choice(len(ANOMALY_TYPES), n_anomalies, p=ANOMALY_PROBS)
+
+        labels = np.full(len(df), -1)
+        labels[rows] = kinds
+    else:
+        # Rows are part-major: each part covers every day in order
+        labels = np.tile(day_kinds, len(df) // len(day_kinds))
+        labels[rng.random(len(df)) >= EPISODE_PART_SHARE] = -1
+        n_anomalies = int(np.sum(labels >= 0))
+
+    def scale(column, idx, low, high, as_int=False):
+        values = df[column].to_numpy()[idx] * rng.uniform(low, high, len(idx))
+        df.iloc[idx, df.columns.get_loc(column)] = np.trunc(values).astype(np.int64) if as_int else values
+
+    spike = np.flatnonzero(labels == 0)
+    factor = rng.uniform(1.5, 2.0, len(spike))
+    for column in ["daily_demand_qty", "order_qty"]:
+        df.iloc[spike, df.columns.get_loc(column)] = np.trunc(
+            df[column].to_numpy()[spike] * factor
+        ).astype(np.int64)
+    scale("on_hand_inventory_qty", spike, 0.5, 0.7, as_int=True)
+
+    disruption = np.flatnonzero(labels == 1)
+    scale("supplier_lead_time_days", disruption, 1.5, 2.5, as_int=True)
+    df.iloc[disruption, df.columns.get_loc("supplier_delay_days")] += rng.integers(5, 15, len(disruption))
+    scale("order_fulfillment_rate", disruption, 0.5, 0.8)
+
+    scale("total_part_cost", np.flatnonzero(labels == 2), 3.0, 6.0)
+
+    df["is_anomaly"] = (labels >= 0).astype(np.int8)
+    df["anomaly_type"] = np.array(ANOMALY_TYPES + [NO_ANOMALY])[labels]
+
+    return n_anomalies
 
-for idx in anomaly_indices:
-    anomaly_type = np.random.choice(
-        ["demand_spike", "supply_disruption", "data_quality"],
-        p=[0.4, 0.4, 0.2]
-    )
 
-    if anomaly_type == "demand_spike":
-        factor = np.random.uniform(1.5, 2.0)
-
-        df.loc[idx, "daily_demand_qty"] = int(df.loc[idx, "daily_demand_qty"] * factor)
-        df.loc[idx, "order_qty"] = int(df.loc[idx, "order_qty"] * factor)
-        #df.loc[idx, ["daily_demand_qty", "order_qty"]] *= np.random.uniform(1.5, 2.0)
-        df.loc[idx, "on_hand_inventory_qty"] = int(df.loc[idx, "on_hand_inventory_qty"] * np.random.uniform(0.5, 0.7))
-
-    elif anomaly_type == "supply_disruption":
-        df.loc[idx, "supplier_lead_time_days"] = int(df.loc[idx, "supplier_lead_time_days"] * np.random.uniform(1.5, 2.5))
-        df.loc[idx, "supplier_delay_days"] += np.random.randint(5, 15)
-        df.loc[idx, "order_fulfillment_rate"] *= np.random.uniform(0.5, 0.8)
+# -----------------------------
+# Chunked writers
+# -----------------------------
+class CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.path, index=False, mode="w" if self.header else "a", header=self.header)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        import pyarrow.parquet as pq  # optional dependency, only needed for parquet output
+
+        self.pq = pq
+        self.path = path
+        self.writer = None
+
+    def write(self, df):
+        import pyarrow as pa
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+WRITERS = {"csv": CsvWriter, "parquet": ParquetWriter}
+
+
+def generate(output_path, n_parts=N_PARTS, n_days=N_DAYS, anomaly_rate=ANOMALY_RATE,
+             start_date=START_DATE, seed=RANDOM_SEED, chunk_rows=CHUNK_ROWS, fmt="csv", episodes=0):
+    """
+    Generate n_parts x n_days rows in part blocks of ~chunk_rows rows,
+    writing each block as it is produced. episodes > 0 injects the
+    anomalies as that many contiguous episodes instead of scattered rows.
+    Returns (rows, anomalies).
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, periods=n_days, freq="D").to_numpy()
+    parts = generate_parts(n_parts, rng)
+    day_kinds = plan_episodes(n_days, anomaly_rate, episodes, rng) if episodes else None
+    parts_per_chunk = max(chunk_rows // n_days, 1)
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    writer = WRITERS[fmt](output_path)
+
+    n_rows = n_anomalies = 0
+    try:
+        for start in range(0, n_parts, parts_per_chunk):
+            df = generate_daily_records(parts.iloc[start:start + parts_per_chunk], dates, rng)
+            n_anomalies += inject_anomalies(df, anomaly_rate, rng, day_kinds)
+            writer.write(df)
+            n_rows += len(df)
+    finally:
+        writer.close()
+
+    return n_rows, n_anomalies
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Synthetic parts data warehouse generator")
+    parser.add_argument("--parts", type=int, default=N_PARTS)
+    parser.add_argument("--days", type=int, default=N_DAYS)
+    parser.add_argument("--anomaly-rate", type=float, default=ANOMALY_RATE)
+    parser.add_argument("--episodes", type=int, default=0,
+                        help="Inject anomalies as this many contiguous multi-day episodes (0: scattered rows)")
+    parser.add_argument("--start-date", default=START_DATE)
+    parser.add_argument("--seed", type=int, default=RANDOM_SEED)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--format", choices=list(WRITERS), default="csv", help="parquet requires pyarrow")
+    parser.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    return parser.parse_args()
 
-    elif anomaly_type == "data_quality":
-        df.loc[idx, "total_part_cost"] *= np.random.uniform(3.0, 6.0)
 
 # -----------------------------
 # Save
 # -----------------------------
-PROJECT_ROOT = Path(__file__).resolve().parents[1]
-DATA_DIR = PROJECT_ROOT / "data"
-DATA_DIR.mkdir(exist_ok=True)
-
-output_path = DATA_DIR / "parts_dw_happy_path_100k.csv"
-
-df.to_csv(output_path, index=False)
+if __name__ == "__main__":
+    args = parse_args()
+
+    n_rows, n_anomalies = generate(
+        args.output,
+        n_parts=args.parts,
+        n_days=args.days,
+        anomaly_rate=args.anomaly_rate,
+        start_date=args.start_date,
+        seed=args.seed,
+        chunk_rows=args.chunk_rows,
+        fmt=args.format,
+        episodes=args.episodes
+    )
 
-print("Parts DW synthetic dataset created")
-print(f"Rows: {len(df)}")
-print(f"Anomalies injected: {n_anomalies}")
+    print("Parts DW synthetic dataset created")
+    print(f"Rows: {n_rows}")
+    print(f"Anomalies injected: {n_anomalies}")
+    print(f"Saved to: {args.output}")
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+FEATURES = ["orders", "lead_time", "inventory_level", "fill_rate", "claims"]
+
+FEATURE_BOUNDS = {
+    "lead_time": {"expected_max": 7, "caution_max": 10, "critical_max": 14},
+    "inventory_level": {"expected_min": 500, "caution_min": 300, "critical_min": 150},
+    "fill_rate": {"expected_min": 0.95, "caution_min": 0.90},
+}
+
+
+@pytest.fixture
+def features():
+    return list(FEATURES)
+
+
+@pytest.fixture
+def feature_bounds():
+    return dict(FEATURE_BOUNDS)
+
+
+@pytest.fixture
+def state_df():
+    """Daily state whose last ten days breach the critical limits."""
+    rng = np.random.default_rng(7)
+    n = 120
+    df = pd.DataFrame({
+        "time": pd.date_range("2024-01-01", periods=n, freq="D"),
+        "orders": rng.normal(100, 10, n),
+        "lead_time": rng.normal(6, 0.5, n),
+        "inventory_level": rng.normal(700, 50, n),
+        "fill_rate": rng.normal(0.97, 0.005, n),
+        "claims": rng.poisson(4, n).astype(float),
+    })
+    df.loc[n - 10:, ["orders", "lead_time"]] *= 2.5
+    df.loc[n - 10:, ["inventory_level", "fill_rate"]] *= 0.2
+    return df
+
+
+@pytest.fixture
+def config(features, feature_bounds):
+    """Pipeline config over the state_df fixture (Stage 4 cache off)."""
+    return {
+        "data": {"path": "unused.csv", "time_column": "time"},
+        "stage1": {"features": features, "feature_bounds": feature_bounds, "window_days": 14, "alpha": 0.01},
+        "stage3": {
+            "hypotheses": {
+                "supplier_delay": {"prior": 0.5, "expectations": {"lead_time": "up", "fill_rate": "down"}},
+                "demand_spike": {"prior": 0.5, "expectations": {"orders": "up", "inventory_level": "down"}},
+            }
+        },
+        "stage4": {},
+    }
+
+
+@pytest.fixture
+def raw_config(config, state_df, tmp_path):
+    """
+    config over a raw CSV (data.path) with two suppliers per day of the
+    state_df fixture; the state_builder sets no segment keys.
+    """
+    raw = pd.concat([state_df.assign(supplier_id="a"), state_df.assign(supplier_id="b")])
+    raw.rename(columns={"time": "date"}).to_csv(tmp_path / "raw.csv", index=False)
+    config["data"] = {"path": str(tmp_path / "raw.csv")}
+    config["state_builder"] = {
+        "time_unit": "day",
+        "date_column": "date",
+        "aggregations": {feature: "mean" for feature in config["stage1"]["features"]},
+    }
+    return config
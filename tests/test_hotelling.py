@@ -0,0 +1,38 @@
+import numpy as np
+
+from core.hotelling import estimate_moments, hotelling_t2, t2_scores
+
+
+def _explicit_t2(X, mu, Sigma, ridge=1e-6):
+    inverse = np.linalg.inv(Sigma + ridge * np.eye(Sigma.shape[-1]))
+    centered = X - mu
+    return np.einsum("np,pq,nq->n", centered, inverse, centered)
+
+
+def test_t2_scores_match_explicit_inverse():
+    rng = np.random.default_rng(0)
+    # Correlated features on very different scales
+    X = rng.normal(size=(40, 5)) @ rng.normal(size=(5, 5)) * [1, 10, 1e3, 0.01, 1]
+    mu, Sigma = estimate_moments(X)
+
+    np.testing.assert_allclose(t2_scores(X, mu, Sigma), _explicit_t2(X, mu, Sigma), rtol=1e-8)
+
+
+def test_batched_windows_match_one_at_a_time():
+    rng = np.random.default_rng(1)
+    windows = rng.normal(size=(6, 20, 4))
+
+    np.testing.assert_allclose(
+        hotelling_t2(windows),
+        [_explicit_t2(w, *estimate_moments(w)) for w in windows],
+        rtol=1e-8
+    )
+
+
+def test_collinear_features_fall_back_to_pseudo_inverse():
+    rng = np.random.default_rng(2)
+    X = rng.normal(size=(30, 3))
+    # A fourth feature that is an exact combination of the others adds no information
+    collinear = np.column_stack([X, 2 * X[:, 0] - X[:, 1]])
+
+    np.testing.assert_allclose(hotelling_t2(collinear), hotelling_t2(X), rtol=1e-4)
@@ -0,0 +1,58 @@
+import pytest
+
+from core import narrative_cache
+from core.narrative_cache import NarrativeCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time for the cache module."""
+    now = [1000.0]
+    monkeypatch.setattr(narrative_cache.time, "time", lambda: now[0])
+    return now
+
+
+def test_hit_and_miss(tmp_path):
+    cache = NarrativeCache(tmp_path / "narratives.sqlite")
+    key = cache.make_key("model", "prompt", 100)
+
+    assert cache.get(key) is None
+    cache.put(key, "narrative")
+    assert cache.get(key) == "narrative"
+    assert cache.get(cache.make_key("model", "prompt", 200)) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 0, "entries": 1}
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = tmp_path / "narratives.sqlite"
+    cache = NarrativeCache(path)
+    cache.put("key", "narrative")
+    cache.close()
+
+    assert NarrativeCache(path).get("key") == "narrative"
+
+
+def test_expired_entries_are_misses(tmp_path, clock):
+    cache = NarrativeCache(tmp_path / "narratives.sqlite", ttl_seconds=60)
+    cache.put("key", "narrative")
+
+    clock[0] += 60
+    assert cache.get("key") == "narrative"
+    clock[0] += 1
+    assert cache.get("key") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = NarrativeCache(tmp_path / "narratives.sqlite", max_entries=2)
+    cache.put("a", "A")
+    clock[0] += 1
+    cache.put("b", "B")
+    clock[0] += 1
+    assert cache.get("a") == "A"  # b is now the least recently used
+    clock[0] += 1
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+    assert cache.stats()["evictions"] == 1
@@ -0,0 +1,52 @@
+import contextlib
+import io
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.pipeline import Pipeline
+
+
+class FakeClient:
+    """Synchronous stand-in for the Anthropic client."""
+
+    def __init__(self):
+        self.messages = self
+
+    def create(self, **kwargs):
+        return SimpleNamespace(content=[SimpleNamespace(text="narrative")])
+
+
+def _run(config, state_df):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Pipeline(config, narrative_client=FakeClient()).run(state_df=state_df)
+
+
+def test_window_index_is_shared_and_matches_direct_path(config, state_df):
+    direct = _run(config, state_df)
+    config["stage1"].update(window_index=True, window_cross_products=True)
+    indexed = _run(config, state_df)
+
+    assert direct.window_index is None
+    assert indexed.window_index is not None
+    assert indexed.decision_gate == direct.decision_gate == "proceed"
+    np.testing.assert_allclose(indexed.stage1["risk_score"], direct.stage1["risk_score"])
+    np.testing.assert_allclose(
+        [h["posterior"] for h in indexed.stage3], [h["posterior"] for h in direct.stage3]
+    )
+
+
+@pytest.mark.parametrize("store", [False, True])
+def test_build_state_reads_requested_segment_keys(raw_config, state_df, tmp_path, store):
+    if store:
+        raw_config["data"]["store"] = str(tmp_path / "store")
+
+    pipeline = Pipeline(raw_config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        overall = pipeline.build_state()
+        segmented = pipeline.build_state(segment_keys=["supplier_id"])
+
+    assert len(overall) == len(state_df)
+    assert len(segmented) == 2 * len(state_df)
+    assert set(segmented["supplier_id"].astype(str)) == {"a", "b"}
@@ -0,0 +1,105 @@
+import contextlib
+import io
+import threading
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from core.pipeline import Pipeline
+from core.service import ScoringService
+from core.state_builder import build_system_state
+
+
+class LockCheckingClient:
+    """Synchronous fake client recording whether the service lock is held."""
+
+    def __init__(self, lock):
+        self.messages = self
+        self.lock = lock
+        self.held = []
+
+    def create(self, **kwargs):
+        self.held.append(self.lock.locked())
+        return SimpleNamespace(content=[SimpleNamespace(text="narrative")])
+
+
+def _service(config):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ScoringService(Pipeline(config))
+
+
+def test_time_series_config_serves_and_appends(config, state_df, tmp_path):
+    state_df.assign(day=range(len(state_df))).drop(columns="time").to_csv(tmp_path / "state.csv", index=False)
+    config["data"] = {"path": str(tmp_path / "state.csv"), "time_column": "day"}
+    service = _service(config)
+    assert len(service.state_df) == len(state_df)
+
+    row = state_df.iloc[-1].drop("time").to_dict()
+    rows = [{**row, "day": len(state_df)}, {**row, "day": 0}]
+    with contextlib.redirect_stdout(io.StringIO()):
+        status, payload = service.handle("POST", "/append", {"rows": rows, "narrative": False})
+
+    assert status == 200, payload
+    assert payload["buckets_updated"] == 2
+    assert len(service.state_df) == len(state_df) + 1
+    assert service.state_df["orders"].iloc[0] == row["orders"]
+    assert service.state_df["time"].is_monotonic_increasing
+
+
+@pytest.mark.parametrize("store", [False, True])
+def test_append_matches_rebuild(raw_config, tmp_path, store):
+    raw_config["state_builder"]["segment_keys"] = ["supplier_id"]
+    if store:
+        raw_config["data"]["store"] = str(tmp_path / "store")
+    service = _service(raw_config)
+
+    raw = pd.read_csv(raw_config["data"]["path"])
+    # Rows merging into existing buckets, and one opening a new day
+    rows = pd.concat([raw.iloc[[0, 1, 5]], raw.tail(1).assign(date="2024-05-01")]).assign(orders=1.0)
+    service.append(rows.to_dict("records"))
+
+    state_cfg = raw_config["state_builder"]
+    for segment_keys, served in [(None, service.state_df), (["supplier_id"], service.segment_state_df)]:
+        expected = build_system_state(
+            df_raw=pd.concat([raw, rows]),
+            date_column="date",
+            time_unit="day",
+            aggregation_config=state_cfg["aggregations"],
+            segment_keys=segment_keys
+        )
+        pd.testing.assert_frame_equal(
+            served.astype({"supplier_id": str}) if segment_keys else served,
+            expected.astype({"supplier_id": str}) if segment_keys else expected,
+            check_dtype=False,
+            rtol=1e-5
+        )
+
+
+def test_health_and_metrics_do_not_wait_on_scoring(raw_config):
+    service = _service(raw_config)
+    statuses = []
+    thread = threading.Thread(
+        target=lambda: statuses.extend(service.handle("GET", path, {})[0] for path in ("/health", "/metrics")),
+        daemon=True
+    )
+
+    with service.lock:
+        thread.start()
+        thread.join(timeout=5)
+
+    assert statuses == [200, 200]
+
+
+def test_narrative_is_generated_outside_the_lock(raw_config):
+    service = _service(raw_config)
+    client = LockCheckingClient(service.lock)
+    service.pipeline.narrative_client = client
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        status, result = service.handle("POST", "/score", {})
+
+    assert status == 200, result
+    assert result["decision_gate"] == "proceed"
+    assert result["stage4"] == "narrative"
+    assert client.held == [False]
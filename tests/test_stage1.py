@@ -0,0 +1,45 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from core.stage1 import run_stage1_backfill, run_stage1_v2
+
+
+def _single_window(state_df, features, feature_bounds, window_end):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return run_stage1_v2(
+            state_df[state_df["time"] <= window_end], "time", features, feature_bounds, 14, 0.01
+        )
+
+
+def _assert_same(backfill, direct):
+    assert backfill.keys() == direct.keys()
+    for key, value in direct.items():
+        if isinstance(value, float):
+            np.testing.assert_allclose(backfill[key], value, rtol=1e-9, atol=1e-12, err_msg=key)
+        elif isinstance(value, dict):
+            _assert_same(backfill[key], value)
+        else:
+            assert backfill[key] == value, key
+
+
+@pytest.mark.parametrize("nan_rows", [[], [50], [30, 31, 90]])
+def test_backfill_matches_single_window(state_df, features, feature_bounds, nan_rows):
+    state_df.loc[nan_rows, "orders"] = np.nan
+
+    outputs = run_stage1_backfill(state_df, "time", features, feature_bounds, 14, 0.01)
+
+    assert len(outputs) == len(state_df)
+    for out in outputs:
+        _assert_same(out, _single_window(state_df, features, feature_bounds, out["window_end"]))
+
+
+def test_backfill_recovers_after_nan_leaves_window(state_df, features, feature_bounds):
+    state_df.loc[50, "orders"] = np.nan
+
+    outputs = run_stage1_backfill(state_df, "time", features, feature_bounds, 14, 0.01)
+
+    assert np.isnan(outputs[55]["t2_summary"]["mean"])
+    assert all(np.isfinite(out["t2_summary"]["mean"]) for out in outputs[65:])
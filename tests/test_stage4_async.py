@@ -0,0 +1,105 @@
+import asyncio
+import contextlib
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from core.narrative_cache import NarrativeCache
+from core.pipeline import Pipeline
+from core.stage4 import build_stage4_prompt, fallback_narrative, stop_narrative
+from core.stage4_async import run_stage4_batch
+
+
+class FakeAsyncClient:
+    """
+    Async stand-in for the Anthropic client: echoes the prompt after
+    delay(call) seconds, fails the first `failures` calls and records how
+    many calls were in flight at once.
+    """
+
+    def __init__(self, delay=lambda call: 0.0, failures=0):
+        self.messages = self
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def create(self, model, max_tokens, messages):
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay(call))
+            if call <= self.failures:
+                raise RuntimeError("overloaded")
+            return SimpleNamespace(content=[SimpleNamespace(text=messages[0]["content"])])
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def runs(config, state_df):
+    """Twelve proceed runs with distinct prompts (risk scores differ)."""
+    pipeline = Pipeline(config)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = pipeline.run_downstream(pipeline.score(state_df), narrate=False)
+    assert result.decision_gate == "proceed"
+
+    return [
+        ({**result.stage1, "risk_score": 0.5 + i / 100}, result.stage2, result.stage3)
+        for i in range(12)
+    ]
+
+
+def _prompts(runs):
+    return [build_stage4_prompt(*run).strip() for run in runs]
+
+
+def test_concurrency_cap_and_order(runs):
+    # Later calls finish first, so completion order differs from run order
+    client = FakeAsyncClient(delay=lambda call: 0.005 * (13 - call))
+    narratives = run_stage4_batch(runs, client=client, concurrency=3)
+
+    assert client.max_in_flight == 3
+    assert client.calls == len(runs)
+    assert narratives == _prompts(runs)
+
+
+def test_timeouts_are_retried_then_fall_back(runs):
+    client = FakeAsyncClient(delay=lambda call: 1.0)
+    narratives = run_stage4_batch(runs[:2], client=client, timeout=0.01, retries=2, backoff=0)
+
+    assert client.calls == 2 * 3
+    assert client.in_flight == 0
+    assert narratives == [fallback_narrative(runs[0][2])] * 2
+
+
+@pytest.mark.parametrize("failures, recovered", [(2, True), (3, False)])
+def test_retries(runs, failures, recovered):
+    client = FakeAsyncClient(failures=failures)
+    narratives = run_stage4_batch(runs[:1], client=client, retries=2, backoff=0)
+
+    assert client.calls == 3
+    assert narratives == (_prompts(runs[:1]) if recovered else [fallback_narrative(runs[0][2])])
+
+
+def test_stop_runs_skip_the_client(runs):
+    stop = {"decision_gate": "stop", "reason": "Weak signal"}
+    client = FakeAsyncClient()
+    narratives = run_stage4_batch([(stop, None, None), runs[0]], client=client)
+
+    assert client.calls == 1
+    assert narratives == [stop_narrative(stop)] + _prompts(runs[:1])
+
+
+def test_cached_prompts_skip_the_client(runs, tmp_path):
+    cache = NarrativeCache(tmp_path / "narratives.sqlite")
+    first, second = FakeAsyncClient(), FakeAsyncClient()
+
+    assert run_stage4_batch(runs, client=first, cache=cache) == _prompts(runs)
+    assert run_stage4_batch(runs, client=second, cache=cache) == _prompts(runs)
+    assert (first.calls, second.calls) == (len(runs), 0)
+    cache.close()
@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import state_backends
+from core.state_builder import StateAccumulator, build_system_state, build_system_state_chunked
+
+
+AGGREGATIONS = {
+    "qty": "sum",
+    "lead_time": "mean",
+    "cost": "max",
+    "fill_rate": "min",
+    "orders": "count",
+    "part_id": "nunique",
+}
+
+
+@pytest.fixture
+def raw_df():
+    """Raw events over 30 days for three suppliers, with missing values."""
+    rng = np.random.default_rng(3)
+    n = 600
+    df = pd.DataFrame({
+        "date": (
+            pd.Timestamp("2024-03-01") + pd.to_timedelta(rng.integers(0, 30 * 24, n), unit="h")
+        ).strftime("%Y-%m-%d %H:%M"),
+        "supplier_id": rng.choice(["a", "b", "c"], n),
+        "qty": rng.integers(1, 50, n).astype(float),
+        "lead_time": rng.normal(6, 1, n),
+        "cost": rng.gamma(2, 10, n),
+        "fill_rate": rng.uniform(0.8, 1, n),
+        "orders": rng.normal(size=n),
+        "part_id": rng.integers(0, 40, n).astype(float),
+    })
+    for column in ["lead_time", "cost", "orders", "part_id"]:
+        df.loc[rng.random(n) < 0.1, column] = np.nan
+    return df
+
+
+def _build(df_raw, time_unit, segment_keys, **kwargs):
+    return build_system_state(
+        df_raw=df_raw,
+        date_column="date",
+        time_unit=time_unit,
+        aggregation_config=AGGREGATIONS,
+        segment_keys=segment_keys,
+        **kwargs
+    )
+
+
+@pytest.mark.parametrize("segment_keys", [None, ["supplier_id"]])
+@pytest.mark.parametrize("time_unit", ["hour", "day", "week"])
+def test_chunked_build_matches_in_memory_build(raw_df, tmp_path, time_unit, segment_keys):
+    raw_df.to_csv(tmp_path / "raw.csv", index=False)
+
+    # Small chunks split most buckets across several of them
+    chunked = build_system_state_chunked(
+        str(tmp_path / "raw.csv"),
+        date_column="date",
+        time_unit=time_unit,
+        aggregation_config=AGGREGATIONS,
+        segment_keys=segment_keys,
+        chunksize=37
+    )
+
+    pd.testing.assert_frame_equal(chunked, _build(raw_df, time_unit, segment_keys), check_dtype=False)
+
+
+def test_accumulator_finalizes_only_the_updated_keys(raw_df):
+    accumulator = StateAccumulator("date", "day", AGGREGATIONS, segment_keys=["supplier_id"])
+    accumulator.update(raw_df.iloc[:400])
+    keys = accumulator.update(raw_df.iloc[400:])
+
+    full = _build(raw_df, "day", ["supplier_id"])
+    touched = full.set_index(["time", "supplier_id"]).index.isin(
+        keys.rename(["time", "supplier_id"])
+    )
+
+    pd.testing.assert_frame_equal(accumulator.finalize(), full, check_dtype=False)
+    pd.testing.assert_frame_equal(
+        accumulator.finalize(keys), full[touched].reset_index(drop=True), check_dtype=False
+    )
+
+
+@pytest.mark.parametrize("segment_keys", [None, ["supplier_id"]])
+@pytest.mark.parametrize("backend", ["polars", "pyarrow"])
+def test_columnar_backends_match_pandas(raw_df, backend, segment_keys):
+    pytest.importorskip(backend)
+
+    pd.testing.assert_frame_equal(
+        _build(raw_df, "day", segment_keys, backend=backend),
+        _build(raw_df, "day", segment_keys)
+    )
+
+
+def test_missing_backend_falls_back_to_pandas(raw_df, monkeypatch):
+    monkeypatch.setattr(state_backends.importlib.util, "find_spec", lambda name: None)
+
+    with pytest.warns(UserWarning, match="not installed"):
+        state = _build(raw_df, "day", None, backend="polars")
+    assert state_backends.resolve_backend("auto") == "pandas"
+    pd.testing.assert_frame_equal(state, _build(raw_df, "day", None))
@@ -0,0 +1,22 @@
+import pytest
+from scipy import stats
+
+from core.thresholds import chi2_sf, chi2_threshold
+
+
+@pytest.mark.parametrize("p", [1, 2, 5, 11, 50, 300])
+@pytest.mark.parametrize("alpha", [0.5, 0.1, 0.05, 0.01, 0.001, 1e-8])
+def test_chi2_threshold_matches_scipy(alpha, p):
+    assert chi2_threshold(alpha, p) == pytest.approx(stats.chi2.ppf(1 - alpha, p), rel=1e-9)
+
+
+@pytest.mark.parametrize("p", [1, 3, 20])
+@pytest.mark.parametrize("x", [0.01, 0.5, 2.0, 10.0, 40.0])
+def test_chi2_sf_matches_scipy(x, p):
+    assert chi2_sf(x, p) == pytest.approx(stats.chi2.sf(x, p), rel=1e-9)
+
+
+@pytest.mark.parametrize("alpha, p", [(0, 3), (1, 3), (0.05, 0)])
+def test_chi2_threshold_rejects_invalid_arguments(alpha, p):
+    with pytest.raises(ValueError):
+        chi2_threshold(alpha, p)
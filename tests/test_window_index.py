@@ -0,0 +1,61 @@
+import contextlib
+import io
+
+import numpy as np
+import pytest
+
+from core.hotelling import estimate_moments
+from core.stage1 import run_stage1_backfill, run_stage1_v2
+from core.stage2 import run_stage2_v2
+from core.window_index import WindowStatsIndex
+
+
+def _assert_close(a, b):
+    if isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            _assert_close(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            _assert_close(x, y)
+    elif isinstance(a, (float, np.floating, np.ndarray)):
+        np.testing.assert_allclose(a, b, rtol=1e-7, atol=1e-9)
+    else:
+        assert a == b
+
+
+@pytest.mark.parametrize("cross_products", [True, False])
+def test_moments_match_window_rows(state_df, features, cross_products):
+    state_df.loc[20, "claims"] = np.nan
+    index = WindowStatsIndex(state_df, "time", features, cross_products=cross_products)
+    X = state_df[features].to_numpy(dtype=float)
+
+    for lo, hi in [(0, 14), (10, 30), (60, 75), (0, len(X))]:
+        mu, Sigma = index.moments(lo, hi)
+        expected_mu, expected_Sigma = estimate_moments(X[lo:hi])
+        np.testing.assert_allclose(mu, expected_mu, rtol=1e-9)
+        np.testing.assert_allclose(Sigma, expected_Sigma, rtol=1e-7, atol=1e-9)
+
+
+def test_auto_cross_products_respects_size_limit(state_df, features, monkeypatch):
+    assert WindowStatsIndex(state_df, "time", features)._cross is not None
+
+    monkeypatch.setattr("core.window_index.CROSS_PRODUCT_MAX_BYTES", 0)
+    assert WindowStatsIndex(state_df, "time", features)._cross is None
+
+
+@pytest.mark.parametrize("cross_products", [True, False])
+def test_stages_match_direct_path(state_df, features, feature_bounds, cross_products):
+    index = WindowStatsIndex(state_df, "time", features, cross_products=cross_products)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        direct = run_stage1_v2(state_df, "time", features, feature_bounds)
+        indexed = run_stage1_v2(state_df, "time", features, feature_bounds, index=index)
+    _assert_close(indexed, direct)
+
+    for out in run_stage1_backfill(state_df, "time", features, feature_bounds, 14, 0.01)[20::10]:
+        _assert_close(
+            run_stage2_v2(state_df, out, features, 14, index),
+            run_stage2_v2(state_df, out, features, 14)
+        )